@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.metrics_util.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,6 +80,65 @@ DATABASES = {
     }
 }
 
+# В кэше default хранятся несколько версий справочников и рецептов,
+# он должен быть общим для всех процессов gunicorn. Файловый кэш
+# общий для процессов одного контейнера, для нескольких контейнеров
+# нужен Redis или Memcached (CACHE_BACKEND и CACHE_LOCATION).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram-cache'),
+    },
+    'pdf': {
+        'BACKEND': os.getenv(
+            'PDF_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv(
+            'PDF_CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'media', 'pdf_cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('PDF_CACHE_MAX_ENTRIES', 300)),
+        },
+    },
+    'recipes': {
+        'BACKEND': os.getenv(
+            'RECIPE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv(
+            'RECIPE_CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'media', 'recipe_cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RECIPE_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+}
+
+SHOPPING_LIST_EXPORT_WORKERS = int(
+    os.getenv('SHOPPING_LIST_EXPORT_WORKERS', 2)
+)
+SHOPPING_LIST_EXPORT_TTL = int(
+    os.getenv('SHOPPING_LIST_EXPORT_TTL', 24 * 60 * 60)
+)
+METRICS_WINDOW = int(os.getenv('METRICS_WINDOW', 1000))
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'True') == 'True'
+IMAGE_PROCESSING_WORKERS = int(
+    os.getenv('IMAGE_PROCESSING_WORKERS', 2)
+)
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.getenv('IMAGE_UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv('IMAGE_UPLOAD_MAX_PIXELS', 50_000_000)
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
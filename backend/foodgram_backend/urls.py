@@ -4,8 +4,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from utils.metrics_util.views import (
+    PrometheusMetricsView,
+    RequestMetricsView
+)
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics', PrometheusMetricsView.as_view()),
+    path('api/metrics/requests/', RequestMetricsView.as_view()),
     path('api/', include('recipes.urls')),
     path('api/', include('users.urls'))
 ]
@@ -0,0 +1,25 @@
+"""Настройки gunicorn.
+
+Метрики Prometheus всех рабочих процессов собираются
+в каталоге PROMETHEUS_MULTIPROC_DIR, который очищается
+при запуске сервера.
+"""
+import os
+import shutil
+
+prometheus_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus'
+)
+
+
+def on_starting(server):
+    """Очистка каталога метрик прошлого запуска."""
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir)
+
+
+def child_exit(server, worker):
+    """Пометка метрик завершившегося рабочего процесса."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
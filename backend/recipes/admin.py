@@ -1,7 +1,9 @@
 """Регистрация моделей приложения рецепты в админке."""
 from django.contrib import admin
-from django.db.models import Count
 
+from .catalog import ingredient_catalog
+from .images import enqueue_image
+from .ingredients import upsert_ingredient
 from .models import Ingredient, Recipe, ShoppingCart, Tag
 
 
@@ -19,23 +21,26 @@ class TagAdmin(admin.ModelAdmin):
 class RecipeAdmin(admin.ModelAdmin):
     """Регистрация рецепта в админке."""
 
-    def get_queryset(self, request):
-        """Аннотация рецептов для подсчета."""
-        return super().get_queryset(request).annotate(
-            favorited_count=Count('favourite_recipe')
-        )
-
-    def favorited_count(self, obj):
-        """Подсчет добавлений рецепта в избранное."""
-        return obj.favorited_count
-
-    favorited_count.short_description = 'Количество добавлений в избранное'
-    favorited_count.admin_order_field = 'favorited_count'
-
-    list_display = ('name', 'author', 'favorited_count')
+    list_display = ('name', 'author', 'favorites_count', 'cart_count')
+    readonly_fields = (
+        'favorites_count', 'cart_count', 'image_variants', 'image_status'
+    )
     list_filter = ('tags', 'author')
     search_fields = ('name',)
 
+    def save_model(self, request, obj, form, change):
+        """Новое изображение ставится в очередь на обработку."""
+        image_changed = 'image' in form.changed_data and obj.image
+        if image_changed:
+            obj.image_variants = {}
+            obj.image_status = Recipe.ImageStatus.PENDING
+        elif not obj.image:
+            obj.image_variants = {}
+            obj.image_status = Recipe.ImageStatus.DONE
+        super().save_model(request, obj, form, change)
+        if image_changed:
+            enqueue_image(obj)
+
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
@@ -44,3 +49,10 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     list_display = ('name', 'measurement_units')
     list_filter = ('name',)
+
+    def save_model(self, request, obj, form, change):
+        """Новый ингредиент записывается без дублей одним запросом."""
+        if change:
+            return super().save_model(request, obj, form, change)
+        obj.pk = upsert_ingredient(obj.name, obj.measurement_units)
+        ingredient_catalog.bump_version()
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        import recipes.catalog  # noqa: F401
+        import recipes.response_cache  # noqa: F401
+        from recipes.cart_items import fill_cart_items
+        from recipes.constraints import remove_duplicates_before_migrate
+        from recipes.counters import fill_counters
+        from recipes.images import fill_image_status
+        from recipes.search import create_trigram_index
+
+        pre_migrate.connect(remove_duplicates_before_migrate, sender=self)
+        post_migrate.connect(create_trigram_index, sender=self)
+        post_migrate.connect(fill_cart_items, sender=self)
+        post_migrate.connect(fill_counters, sender=self)
+        post_migrate.connect(fill_image_status, sender=self)
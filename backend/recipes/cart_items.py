@@ -0,0 +1,134 @@
+"""Суммы ингредиентов в списках покупок.
+
+Для каждой пары список покупок - ингредиент хранится сумма
+количества и число рецептов списка с этим ингредиентом. Суммы
+изменяются одним INSERT ... ON CONFLICT при добавлении и удалении
+рецепта из списка и при изменении ингредиентов рецепта, строки
+без рецептов удаляются.
+"""
+from django.db import connection, transaction
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.models import (
+    RecipeIngredient,
+    ShoppingCartItem,
+    ShoppingCartRecipe
+)
+
+UPSERT_SQL = (
+    'INSERT INTO {items} '
+    '(shopping_cart_id, ingredient_id, amount, recipes_count) {select} '
+    'ON CONFLICT (shopping_cart_id, ingredient_id) DO UPDATE SET '
+    'amount = {items}.amount + EXCLUDED.amount, '
+    'recipes_count = {items}.recipes_count + EXCLUDED.recipes_count'
+)
+RECIPE_SELECT_SQL = (
+    'SELECT %s, ingredient_id, %s * amount, %s '
+    'FROM {recipe_ingredients} WHERE recipe_id = %s'
+)
+CARTS_SELECT_SQL = (
+    'SELECT shopping_cart_id, %s, %s, %s '
+    'FROM {cart_recipes} WHERE recipe_id = %s'
+)
+REBUILD_SQL = (
+    'INSERT INTO {items} '
+    '(shopping_cart_id, ingredient_id, amount, recipes_count) '
+    'SELECT cart_recipe.shopping_cart_id, recipe_ingredient.ingredient_id, '
+    'SUM(recipe_ingredient.amount), COUNT(*) '
+    'FROM {cart_recipes} cart_recipe '
+    'JOIN {recipe_ingredients} recipe_ingredient '
+    'ON recipe_ingredient.recipe_id = cart_recipe.recipe_id '
+    'GROUP BY cart_recipe.shopping_cart_id, recipe_ingredient.ingredient_id'
+)
+
+
+def get_sql(template, **parts):
+    """Запрос с именами таблиц моделей."""
+    tables = {
+        name: connection.ops.quote_name(model._meta.db_table)
+        for name, model in (
+            ('items', ShoppingCartItem),
+            ('recipe_ingredients', RecipeIngredient),
+            ('cart_recipes', ShoppingCartRecipe),
+        )
+    }
+    return template.format(
+        **tables,
+        **{name: part.format(**tables) for name, part in parts.items()}
+    )
+
+
+def delete_empty_items(shopping_cart_ids):
+    """Удаление сумм ингредиентов, которых нет в рецептах списка."""
+    ShoppingCartItem.objects.filter(
+        shopping_cart_id__in=shopping_cart_ids,
+        recipes_count__lte=0
+    ).delete()
+
+
+def change_cart_recipe(shopping_cart_id, recipe_id, sign):
+    """Добавление (sign 1) или вычитание (sign -1) ингредиентов рецепта."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            get_sql(UPSERT_SQL, select=RECIPE_SELECT_SQL),
+            [shopping_cart_id, sign, sign, recipe_id]
+        )
+    if sign < 0:
+        delete_empty_items([shopping_cart_id])
+
+
+@receiver(post_save, sender=ShoppingCartRecipe)
+def add_cart_recipe(instance, created, **kwargs):
+    """Добавление ингредиентов рецепта в суммы списка покупок."""
+    if created:
+        change_cart_recipe(instance.shopping_cart_id, instance.recipe_id, 1)
+
+
+@receiver(pre_delete, sender=ShoppingCartRecipe)
+def remove_cart_recipe(instance, **kwargs):
+    """Вычитание ингредиентов рецепта из сумм списка покупок.
+
+    Вызывается до удаления, потому что при удалении рецепта
+    его ингредиенты удаляются каскадно вместе со связью.
+    """
+    change_cart_recipe(instance.shopping_cart_id, instance.recipe_id, -1)
+
+
+def change_recipe_ingredients(recipe_id, changes):
+    """Изменение сумм во всех списках покупок с рецептом.
+
+    changes - список троек (id ингредиента, изменение количества,
+    изменение числа рецептов).
+    """
+    if not changes:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            get_sql(UPSERT_SQL, select=CARTS_SELECT_SQL),
+            [
+                [ingredient_id, amount, recipes_count, recipe_id]
+                for ingredient_id, amount, recipes_count in changes
+            ]
+        )
+    if any(recipes_count < 0 for _, _, recipes_count in changes):
+        delete_empty_items(
+            ShoppingCartRecipe.objects.filter(recipe_id=recipe_id)
+            .values('shopping_cart_id')
+        )
+
+
+@transaction.atomic
+def rebuild_cart_items():
+    """Пересчет всех сумм одним запросом, возвращает число строк."""
+    ShoppingCartItem.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(get_sql(REBUILD_SQL))
+        return cursor.rowcount
+
+
+def fill_cart_items(**kwargs):
+    """Заполнение сумм после создания таблицы ShoppingCartItem."""
+    if (ShoppingCartRecipe.objects.exists()
+            and not ShoppingCartItem.objects.exists()):
+        rebuild_cart_items()
@@ -0,0 +1,117 @@
+"""Кэш справочников ингредиентов и тэгов.
+
+Готовый JSON справочника хранится в памяти процесса. Версия
+справочника хранится в общем кэше и меняется при сохранении
+и удалении объектов, после чего каждый процесс заново
+сериализует справочник при следующем запросе.
+"""
+import hashlib
+import time
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import Ingredient, Tag
+from recipes.serializers import IngredientSerializer, TagSerializer
+from utils.metrics_util.prometheus import record_cache
+
+
+class CatalogCache:
+    """Сериализованный справочник в памяти процесса."""
+
+    def __init__(self, name, model, serializer_class):
+        """Init метод класса."""
+        self.name = name
+        self.version_key = f'catalog:{name}:version'
+        self.model = model
+        self.serializer_class = serializer_class
+        self.lock = Lock()
+        self.version = None
+        self.content = None
+        self.etag = None
+
+    def get_version(self):
+        """Текущая версия справочника в общем кэше.
+
+        Версия - время последнего изменения справочника.
+        """
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def bump_version(self):
+        """Новая версия справочника после фиксации транзакции.
+
+        Иначе другой процесс может прочитать новую версию
+        и сохранить в памяти справочник без незафиксированных строк.
+        """
+        transaction.on_commit(
+            lambda: cache.set(self.version_key, time.time(), timeout=None)
+        )
+
+    def get(self):
+        """Версия, ETag и JSON справочника.
+
+        Справочник сериализуется заново только при смене версии.
+        """
+        version = self.get_version()
+        with self.lock:
+            record_cache(f'catalog_{self.name}', self.version == version)
+            if self.version != version:
+                serializer = self.serializer_class(
+                    self.model.objects.all(), many=True
+                )
+                self.content = JSONRenderer().render(serializer.data)
+                self.etag = quote_etag(
+                    hashlib.md5(self.content).hexdigest()
+                )
+                self.version = version
+            return self.version, self.etag, self.content
+
+    def response(self, request):
+        """Ответ со справочником или 304, если он не изменился."""
+        version, etag, content = self.get()
+        last_modified = int(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = HttpResponse(
+                content, content_type='application/json'
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+ingredient_catalog = CatalogCache('ingredients', Ingredient,
+                                  IngredientSerializer)
+tag_catalog = CatalogCache('tags', Tag, TagSerializer)
+CATALOGS = {
+    Ingredient: ingredient_catalog,
+    Tag: tag_catalog,
+}
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredient_catalog(**kwargs):
+    """Новая версия справочника ингредиентов."""
+    ingredient_catalog.bump_version()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tag_catalog(**kwargs):
+    """Новая версия справочника тэгов."""
+    tag_catalog.bump_version()
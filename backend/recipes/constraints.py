@@ -0,0 +1,86 @@
+"""Подготовка данных к уникальным ограничениям.
+
+Перед миграциями приложения recipes удаляются дубли, которые
+не позволили бы создать уникальные индексы. Таблицы изменяются
+запросами SQL по столбцам, которые уже есть в базе: сигналы
+моделей не отправляются, а каскадное удаление ORM не обращается
+к таблицам и полям, которые миграции еще не создали.
+"""
+from django.db import connection, transaction
+
+from recipes.ingredients import get_table, merge_duplicate_ingredients
+from recipes.models import (
+    Ingredient,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCartItem,
+    ShoppingCartRecipe
+)
+
+DELETE_DUPLICATES_SQL = (
+    'DELETE FROM {table} WHERE id NOT IN '
+    '(SELECT MIN(id) FROM {table} GROUP BY {columns})'
+)
+RECIPE_INGREDIENT_DUPLICATES_SQL = (
+    'SELECT MIN(id), SUM(amount) FROM {table} '
+    'GROUP BY recipe_id, ingredient_id HAVING COUNT(*) > 1'
+)
+UPDATE_AMOUNT_SQL = 'UPDATE {table} SET amount = %s WHERE id = %s'
+
+
+def delete_duplicates(model, columns):
+    """Удаление строк с повторяющимися значениями столбцов.
+
+    Остается строка с наименьшим id. Возвращает число удаленных строк.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_DUPLICATES_SQL.format(
+            table=get_table(model),
+            columns=', '.join(
+                connection.ops.quote_name(column) for column in columns
+            )
+        ))
+        return cursor.rowcount
+
+
+@transaction.atomic
+def merge_duplicate_recipe_ingredients():
+    """Объединение повторов одного ингредиента в рецепте.
+
+    Количество суммируется в строке с наименьшим id.
+    Возвращает число удаленных строк.
+    """
+    table = get_table(RecipeIngredient)
+    with connection.cursor() as cursor:
+        cursor.execute(RECIPE_INGREDIENT_DUPLICATES_SQL.format(table=table))
+        duplicates = cursor.fetchall()
+        if not duplicates:
+            return 0
+        cursor.executemany(
+            UPDATE_AMOUNT_SQL.format(table=table),
+            [(total_amount, kept_id) for kept_id, total_amount in duplicates]
+        )
+    return delete_duplicates(RecipeIngredient, ('recipe_id', 'ingredient_id'))
+
+
+def remove_duplicates_before_migrate(**kwargs):
+    """Удаление дублей в существующих таблицах.
+
+    Если дубли были, суммы списков покупок удаляются
+    и пересчитываются после миграций в fill_cart_items.
+    """
+    table_names = connection.introspection.table_names()
+    changed_count = 0
+    if Ingredient._meta.db_table in table_names:
+        changed_count += merge_duplicate_ingredients()
+    if RecipeIngredient._meta.db_table in table_names:
+        changed_count += merge_duplicate_recipe_ingredients()
+    if RecipeTag._meta.db_table in table_names:
+        delete_duplicates(RecipeTag, ('recipe_id', 'tag_id'))
+    if ShoppingCartRecipe._meta.db_table in table_names:
+        changed_count += delete_duplicates(
+            ShoppingCartRecipe, ('shopping_cart_id', 'recipe_id')
+        )
+    if changed_count and ShoppingCartItem._meta.db_table in table_names:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {get_table(ShoppingCartItem)}')
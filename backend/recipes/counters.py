@@ -0,0 +1,71 @@
+"""Счетчики добавлений рецепта в избранное и в списки покупок.
+
+Счетчики хранятся в полях рецепта и изменяются атомарным
+UPDATE с F() при добавлении и удалении связей.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Favourite, Recipe, ShoppingCartRecipe
+
+COUNTERS = {
+    Favourite: 'favorites_count',
+    ShoppingCartRecipe: 'cart_count',
+}
+
+
+def change_counter(instance, delta):
+    """Изменение счетчика рецепта на delta."""
+    field = COUNTERS[type(instance)]
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=ShoppingCartRecipe)
+def increment_counter(instance, created, **kwargs):
+    """Увеличение счетчика при добавлении рецепта."""
+    if created:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCartRecipe)
+def decrement_counter(instance, **kwargs):
+    """Уменьшение счетчика при удалении рецепта."""
+    change_counter(instance, -1)
+
+
+def recalculate_counters():
+    """Пересчет всех счетчиков одним запросом."""
+    return Recipe.objects.update(**{
+        field: Coalesce(
+            Subquery(
+                model.objects
+                .filter(recipe=OuterRef('pk'))
+                .order_by()
+                .values('recipe')
+                .annotate(count=Count('id'))
+                .values('count')
+            ),
+            0
+        )
+        for model, field in COUNTERS.items()
+    })
+
+
+def fill_counters(**kwargs):
+    """Заполнение счетчиков после добавления их полей в Recipe.
+
+    Счетчики пересчитываются, если избранное или списки покупок
+    не пусты, а у всех рецептов счетчики нулевые.
+    """
+    has_links = any(model.objects.exists() for model in COUNTERS)
+    has_counters = Recipe.objects.filter(
+        Q(favorites_count__gt=0) | Q(cart_count__gt=0)
+    ).exists()
+    if has_links and not has_counters:
+        recalculate_counters()
@@ -0,0 +1,370 @@
+"""Синтетический набор данных для нагрузочного тестирования.
+
+Объекты записываются пакетами: на PostgreSQL через COPY FROM STDIN,
+на остальных базах данных одним INSERT через executemany.
+Пользователи, рецепты и списки покупок получают явные id, начиная
+со следующего после последнего существующего id, поэтому
+при одинаковом seed набор данных повторяется.
+"""
+import io
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    connection,
+    connections,
+    transaction
+)
+from django.db.models import Max
+
+from recipes.cart_items import rebuild_cart_items
+from recipes.catalog import ingredient_catalog
+from recipes.counters import recalculate_counters
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    ShoppingCartRecipe,
+    Tag
+)
+from recipes.versions import (
+    AUTHORS_VERSION_KEY,
+    POPULARITY_VERSION_KEY,
+    RECIPES_VERSION_KEY,
+    bump_versions
+)
+from users.models import Subscription, User
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+DATASET_PASSWORD = 'benchmark'
+
+
+def get_next_id(model):
+    """Следующий после последнего существующего id модели."""
+    return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+
+def get_copy_value(value):
+    """Значение поля в текстовом формате COPY."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, timedelta):
+        return f'{value.total_seconds()} seconds'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+def get_rows(fields, batch):
+    """Значения полей объектов в том виде, в котором они пишутся в базу."""
+    # Прокси connection ищет соединение текущего потока при каждом
+    # обращении, на миллионах значений это заметно.
+    db_connection = connections[DEFAULT_DB_ALIAS]
+    return [
+        [
+            field.get_db_prep_save(field.pre_save(obj, True), db_connection)
+            for field in fields
+        ]
+        for obj in batch
+    ]
+
+
+def copy_insert(table, columns, rows):
+    """Запись строк через COPY FROM STDIN."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(get_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer
+        )
+
+
+def executemany_insert(table, columns, rows):
+    """Запись строк одним подготовленным INSERT."""
+    placeholders = ', '.join(['%s'] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) '
+            f'VALUES ({placeholders})',
+            rows
+        )
+
+
+def bulk_insert(model, objects, batch_size):
+    """Запись объектов пакетами, возвращает их количество.
+
+    Сигналы модели и проверки bulk_create не выполняются,
+    автоинкрементный id заполняется базой, если он не задан.
+    """
+    insert = (
+        copy_insert if connection.vendor == 'postgresql'
+        else executemany_insert
+    )
+    table = connection.ops.quote_name(model._meta.db_table)
+    objects = iter(objects)
+    count = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return count
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not (field.primary_key and batch[0].pk is None)
+        ]
+        insert(
+            table,
+            [connection.ops.quote_name(field.column) for field in fields],
+            get_rows(fields, batch)
+        )
+        count += len(batch)
+
+
+class PopularitySampler:
+    """Выбор id по степенному закону популярности.
+
+    Вероятность выбора id обратно пропорциональна его рангу
+    в степени skew, ранги распределяются случайно. При skew 0
+    все id выбираются равновероятно.
+    """
+
+    def __init__(self, ids, skew, rng):
+        """Init метод класса."""
+        self.ids = list(ids)
+        self.rng = rng
+        self.rng.shuffle(self.ids)
+        self.cum_weights = None
+        if skew:
+            self.cum_weights = list(accumulate(
+                1 / rank ** skew for rank in range(1, len(self.ids) + 1)
+            ))
+
+    def choice(self):
+        """Один id."""
+        return self.sample_with_repeats(1)[0]
+
+    def sample_with_repeats(self, count):
+        """Список id, в котором возможны повторы."""
+        if self.cum_weights is None:
+            return [self.rng.choice(self.ids) for _ in range(count)]
+        return self.rng.choices(
+            self.ids, cum_weights=self.cum_weights, k=count
+        )
+
+    def sample(self, count):
+        """Не более count разных id."""
+        if self.cum_weights is None:
+            return self.rng.sample(self.ids, count)
+        return list(dict.fromkeys(self.sample_with_repeats(count)))
+
+
+class DatasetGenerator:
+    """Генератор пользователей, рецептов и их связей.
+
+    Количество избранных, рецептов в списке покупок и подписок
+    у пользователей распределено экспоненциально вокруг
+    заданного среднего. Авторы рецептов, избранные рецепты,
+    рецепты в списках покупок и авторы в подписках выбираются
+    по степенному закону популярности с показателем skew.
+    """
+
+    def __init__(self, users, recipes, ingredients_per_recipe=8,
+                 tags_per_recipe=2, favourites_per_user=10,
+                 cart_recipes_per_user=3, subscriptions_per_user=5,
+                 skew=1.0, seed=0, batch_size=5000):
+        """Init метод класса."""
+        self.users = users
+        self.recipes = recipes
+        self.ingredients_per_recipe = ingredients_per_recipe
+        self.tags_per_recipe = tags_per_recipe
+        self.favourites_per_user = favourites_per_user
+        self.cart_recipes_per_user = cart_recipes_per_user
+        self.subscriptions_per_user = subscriptions_per_user
+        self.skew = skew
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+
+    def get_sampler(self, ids):
+        """Выбор id по популярности."""
+        return PopularitySampler(ids, self.skew, self.random)
+
+    def get_count(self, mean, limit):
+        """Случайное количество связей пользователя."""
+        if not mean:
+            return 0
+        return min(limit, int(self.random.expovariate(1 / mean)))
+
+    def get_ingredient_ids(self):
+        """Id ингредиентов, при пустом справочнике он загружается."""
+        if not Ingredient.objects.exists():
+            call_command('import_csv', verbosity=0)
+        return list(Ingredient.objects.order_by('id').values_list(
+            'id', flat=True
+        ))
+
+    def get_tag_ids(self):
+        """Id тэгов, при их отсутствии создаются стандартные."""
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug, color=color)
+                for name, slug, color in DEFAULT_TAGS
+            )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_users(self):
+        """Пользователи с одинаковым паролем DATASET_PASSWORD."""
+        first_id = get_next_id(User)
+        password = make_password(DATASET_PASSWORD)
+        bulk_insert(User, (
+            User(
+                id=user_id,
+                username=f'user{user_id}',
+                email=f'user{user_id}@example.com',
+                first_name='Пользователь',
+                last_name=str(user_id),
+                password=password
+            )
+            for user_id in range(first_id, first_id + self.users)
+        ), self.batch_size)
+        return range(first_id, first_id + self.users)
+
+    def create_recipes(self, user_ids):
+        """Рецепты случайных авторов."""
+        first_id = get_next_id(Recipe)
+        authors = self.get_sampler(user_ids)
+        bulk_insert(Recipe, (
+            Recipe(
+                id=recipe_id,
+                name=f'Рецепт {recipe_id}',
+                author_id=authors.choice(),
+                text=f'Инструкции по приготовлению рецепта {recipe_id}',
+                cooking_time=timedelta(minutes=self.random.randint(5, 180)),
+                image_status=Recipe.ImageStatus.DONE
+            )
+            for recipe_id in range(first_id, first_id + self.recipes)
+        ), self.batch_size)
+        return range(first_id, first_id + self.recipes)
+
+    def create_recipe_links(self, recipe_ids, ingredient_ids, tag_ids):
+        """Ингредиенты и тэги рецептов."""
+        bulk_insert(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=Decimal(self.random.randint(1, 500))
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.random.sample(
+                ingredient_ids,
+                min(len(ingredient_ids), self.ingredients_per_recipe)
+            )
+        ), self.batch_size)
+        bulk_insert(RecipeTag, (
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                tag_ids, min(len(tag_ids), self.tags_per_recipe)
+            )
+        ), self.batch_size)
+
+    def create_favourites(self, user_ids, recipe_ids):
+        """Избранные рецепты пользователей."""
+        recipes = self.get_sampler(recipe_ids)
+        return bulk_insert(Favourite, (
+            Favourite(user_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in recipes.sample(
+                self.get_count(self.favourites_per_user, len(recipe_ids))
+            )
+        ), self.batch_size)
+
+    def create_shopping_carts(self, user_ids, recipe_ids):
+        """Списки покупок пользователей и рецепты в них."""
+        first_id = get_next_id(ShoppingCart)
+        recipes = self.get_sampler(recipe_ids)
+        cart_recipes = {}
+        for user_id in user_ids:
+            count = self.get_count(self.cart_recipes_per_user, len(recipe_ids))
+            if count:
+                cart_recipes[user_id] = recipes.sample(count)
+        cart_ids = dict(zip(cart_recipes, range(first_id, first_id + len(
+            cart_recipes
+        ))))
+        bulk_insert(ShoppingCart, (
+            ShoppingCart(id=cart_id, author_id=user_id)
+            for user_id, cart_id in cart_ids.items()
+        ), self.batch_size)
+        return bulk_insert(ShoppingCartRecipe, (
+            ShoppingCartRecipe(
+                shopping_cart_id=cart_ids[user_id], recipe_id=recipe_id
+            )
+            for user_id, recipes in cart_recipes.items()
+            for recipe_id in recipes
+        ), self.batch_size)
+
+    def create_subscriptions(self, user_ids):
+        """Подписки пользователей на других пользователей."""
+        authors = self.get_sampler(user_ids)
+        return bulk_insert(Subscription, (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in authors.sample(
+                self.get_count(self.subscriptions_per_user, len(user_ids))
+            )
+            if author_id != user_id
+        ), self.batch_size)
+
+    def reset_sequences(self):
+        """Сдвиг последовательностей id после записи явных id."""
+        sql_list = connection.ops.sequence_reset_sql(
+            no_style(), [User, Recipe, ShoppingCart]
+        )
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
+
+    @transaction.atomic
+    def generate(self):
+        """Создание набора данных, возвращает количество объектов."""
+        ingredient_ids = self.get_ingredient_ids()
+        tag_ids = self.get_tag_ids()
+        user_ids = self.create_users()
+        recipe_ids = self.create_recipes(user_ids)
+        self.create_recipe_links(recipe_ids, ingredient_ids, tag_ids)
+        counts = {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'favourites': self.create_favourites(user_ids, recipe_ids),
+            'shopping_cart_recipes': self.create_shopping_carts(
+                user_ids, recipe_ids
+            ),
+            'subscriptions': self.create_subscriptions(user_ids),
+        }
+        self.reset_sequences()
+        recalculate_counters()
+        rebuild_cart_items()
+        ingredient_catalog.bump_version()
+        bump_versions(
+            RECIPES_VERSION_KEY, POPULARITY_VERSION_KEY, AUTHORS_VERSION_KEY
+        )
+        return counts
@@ -1,7 +1,17 @@
 """Фильтры для приложения api."""
 
-from django.db.models import Value, When, Case, Q, IntegerField
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as djangofilters
+from django_filters.constants import EMPTY_VALUES
+from django_filters.widgets import BooleanWidget
+
+from recipes.models import (
+    Favourite,
+    Recipe,
+    RecipeTag,
+    ShoppingCartRecipe
+)
+from recipes.search import search_ingredients
 
 
 class IngredientFilter(djangofilters.FilterSet):
@@ -17,19 +27,83 @@ class IngredientFilter(djangofilters.FilterSet):
         name = self.data.get('name')
         if not name:
             return queryset
-        else:
-            queryset = queryset.annotate(
-                starts_with_search=Case(
-                    When(name__startswith=name, then=Value(0)),
-                    default=Value(1),
-                    output_field=IntegerField()
-                ),
-                contains_search=Case(
-                    When(name__icontains=name, then=Value(0)),
-                    default=Value(1),
-                    output_field=IntegerField())
-            ).filter(Q(starts_with_search=0) | Q(contains_search=0)
-                     ).order_by('starts_with_search',
-                                'contains_search', 'name'
-                                )
-            return queryset
+        return search_ingredients(queryset, name)
+
+
+class StableOrderingFilter(djangofilters.OrderingFilter):
+    """Сортировка с id последним полем.
+
+    Одинаковые значения сортируемых полей упорядочиваются по id,
+    поэтому постраничная выдача не повторяет и не теряет строки.
+    """
+
+    def filter(self, qs, value):
+        """Сортировка выдачи."""
+        if value in EMPTY_VALUES:
+            return qs
+        ordering = [self.get_ordering_value(param) for param in value]
+        return qs.order_by(*ordering, 'id')
+
+
+class RecipeFilter(djangofilters.FilterSet):
+    """Фильтр рецептов.
+
+    Условия на связанные таблицы задаются подзапросами EXISTS,
+    поэтому строки рецептов не размножаются и DISTINCT не нужен.
+    """
+
+    tags = djangofilters.CharFilter(method='filter_tags')
+    author = djangofilters.NumberFilter(field_name='author')
+    is_favorited = djangofilters.BooleanFilter(
+        method='filter_is_favorited',
+        widget=BooleanWidget()
+    )
+    is_in_shopping_cart = djangofilters.BooleanFilter(
+        method='filter_is_in_shopping_cart',
+        widget=BooleanWidget()
+    )
+    ordering = StableOrderingFilter(
+        fields=(('favorites_count', 'popularity'),)
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тэгов."""
+        return queryset.filter(Exists(
+            RecipeTag.objects.filter(
+                recipe=OuterRef('pk'),
+                tag__slug__in=self.data.getlist('tags')
+            )
+        ))
+
+    def filter_by_user(self, queryset, value, subquery):
+        """Рецепты, для которых подзапрос пользователя есть или нет."""
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        if value:
+            return queryset.filter(Exists(subquery(user)))
+        return queryset.filter(~Exists(subquery(user)))
+
+    def filter_is_favorited(self, queryset, name, value):
+        """Рецепты в избранных пользователя."""
+        return self.filter_by_user(
+            queryset,
+            value,
+            lambda user: Favourite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )
+        )
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        """Рецепты в списке покупок пользователя."""
+        return self.filter_by_user(
+            queryset,
+            value,
+            lambda user: ShoppingCartRecipe.objects.filter(
+                shopping_cart__author=user, recipe=OuterRef('pk')
+            )
+        )
@@ -0,0 +1,82 @@
+"""Фоновая обработка изображений рецептов."""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from recipes.models import Recipe
+from recipes.versions import bump_recipes_version
+from utils.metrics_util.prometheus import IMAGE_PROCESSING_DURATION
+from utils.image_util.image_process import (
+    delete_image_files,
+    get_variant_names,
+    save_image_variants
+)
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-image'
+)
+
+
+def process_recipe_image(recipe_id):
+    """Создание вариантов изображения рецепта.
+
+    Варианты и статус ошибки записываются, только если изображение
+    рецепта не поменялось за время обработки, иначе файлы вариантов
+    удаляются. Исходный файл удаляется после записи вариантов.
+    """
+    original_name = None
+    try:
+        recipe = Recipe.objects.only('id', 'image').get(id=recipe_id)
+        original_name = recipe.image.name
+        with recipe.image.open('rb') as image, \
+                IMAGE_PROCESSING_DURATION.time():
+            image_name, variants = save_image_variants(
+                image, Recipe._meta.get_field('image').upload_to
+            )
+        updated = Recipe.objects.filter(
+            id=recipe_id, image=original_name
+        ).update(
+            image=image_name,
+            image_variants=variants,
+            image_status=Recipe.ImageStatus.DONE
+        )
+        if updated:
+            bump_recipes_version()
+            delete_image_files([original_name])
+        else:
+            delete_image_files(get_variant_names(variants))
+    except Recipe.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception('Ошибка обработки изображения рецепта %s', recipe_id)
+        Recipe.objects.filter(id=recipe_id, image=original_name).update(
+            image_status=Recipe.ImageStatus.FAILED
+        )
+    finally:
+        connection.close()
+
+
+def fill_image_status(**kwargs):
+    """Статус обработки после добавления полей вариантов в Recipe.
+
+    Рецептам без изображения обрабатывать нечего, они получают
+    статус DONE. Варианты изображений рецептов, созданных раньше,
+    создает команда process_recipe_images после миграций.
+    """
+    Recipe.objects.filter(
+        Q(image__isnull=True) | Q(image=''),
+        image_status=Recipe.ImageStatus.PENDING
+    ).update(image_status=Recipe.ImageStatus.DONE)
+
+
+def enqueue_image(recipe):
+    """Поставить обработку изображения в очередь после фиксации."""
+    transaction.on_commit(
+        lambda: executor.submit(process_recipe_image, recipe.id)
+    )
@@ -0,0 +1,109 @@
+"""Запись ингредиентов без дублей."""
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from recipes.models import Ingredient, RecipeIngredient, ShoppingCartItem
+
+UPSERT_SQL = (
+    'INSERT INTO {table} (name, measurement_units) VALUES (%s, %s) '
+    'ON CONFLICT (name, measurement_units) '
+    'DO UPDATE SET name = EXCLUDED.name RETURNING id'
+)
+
+
+def get_table(model):
+    """Имя таблицы модели для запроса SQL."""
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def get_placeholders(values):
+    """Параметры запроса для списка значений в IN."""
+    return ', '.join(['%s'] * len(values))
+
+
+def upsert_ingredient(name, measurement_units):
+    """Создать ингредиент или найти существующий одним запросом.
+
+    Возвращает id ингредиента.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_SQL.format(table=get_table(Ingredient)),
+            [name, measurement_units]
+        )
+        return cursor.fetchone()[0]
+
+
+@transaction.atomic
+def merge_duplicate_ingredients():
+    """Объединение ингредиентов с одинаковым названием и единицами.
+
+    Остается ингредиент с наименьшим id, ингредиенты рецептов
+    переносятся на него, количество одного ингредиента
+    в рецепте суммируется. Запись идет запросами SQL без сигналов
+    моделей, поэтому функция работает и до миграций. Суммы списков
+    покупок при объединении удаляются, их нужно пересчитать
+    rebuild_cart_items. Возвращает число удаленных дублей.
+    """
+    ingredients_table = get_table(Ingredient)
+    recipe_ingredients_table = get_table(RecipeIngredient)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id, name, measurement_units FROM {ingredients_table} '
+            f'ORDER BY id'
+        )
+        survivors = {}
+        replaced = {}
+        for ingredient_id, name, measurement_units in cursor.fetchall():
+            survivor_id = survivors.setdefault(
+                (name, measurement_units), ingredient_id
+            )
+            if survivor_id != ingredient_id:
+                replaced[ingredient_id] = survivor_id
+        if not replaced:
+            return 0
+        affected_ids = [*replaced, *set(replaced.values())]
+        cursor.execute(
+            f'SELECT id, recipe_id, ingredient_id, amount '
+            f'FROM {recipe_ingredients_table} '
+            f'WHERE ingredient_id IN ({get_placeholders(affected_ids)}) '
+            f'ORDER BY id',
+            affected_ids
+        )
+        recipe_ingredients = defaultdict(list)
+        for row_id, recipe_id, ingredient_id, amount in cursor.fetchall():
+            survivor_id = replaced.get(ingredient_id, ingredient_id)
+            recipe_ingredients[recipe_id, survivor_id].append(
+                (row_id, amount)
+            )
+        deleted_ids = [
+            row_id
+            for rows in recipe_ingredients.values()
+            for row_id, _ in rows[1:]
+        ]
+        if deleted_ids:
+            cursor.execute(
+                f'DELETE FROM {recipe_ingredients_table} '
+                f'WHERE id IN ({get_placeholders(deleted_ids)})',
+                deleted_ids
+            )
+        cursor.executemany(
+            f'UPDATE {recipe_ingredients_table} '
+            f'SET ingredient_id = %s, amount = %s WHERE id = %s',
+            [
+                (survivor_id, sum(amount for _, amount in rows), rows[0][0])
+                for (_, survivor_id), rows in recipe_ingredients.items()
+            ]
+        )
+        if ShoppingCartItem._meta.db_table in (
+            connection.introspection.table_names(cursor)
+        ):
+            cursor.execute(f'DELETE FROM {get_table(ShoppingCartItem)}')
+        replaced_ids = list(replaced)
+        cursor.execute(
+            f'DELETE FROM {ingredients_table} '
+            f'WHERE id IN ({get_placeholders(replaced_ids)})',
+            replaced_ids
+        )
+    return len(replaced)
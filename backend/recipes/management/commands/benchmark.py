@@ -0,0 +1,257 @@
+"""Бенчмарк эндпоинтов API через тестовый клиент Django."""
+import json
+import math
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment
+)
+
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    ShoppingCartRecipe,
+    Tag
+)
+from users.models import Subscription, User
+
+ENDPOINTS = (
+    # Имя, метод, путь, авторизация, запрос отмены изменений.
+    ('recipes_list_anonymous', 'get', '/api/recipes/', False, None),
+    ('recipes_list', 'get', '/api/recipes/', True, None),
+    ('recipes_list_page_50', 'get', '/api/recipes/?page=50', False, None),
+    ('recipes_list_cursor', 'get', '/api/recipes/?pagination=cursor',
+     False, None),
+    ('recipes_list_popular', 'get', '/api/recipes/?ordering=-popularity',
+     False, None),
+    ('recipes_list_tags', 'get', '/api/recipes/?tags={tag_slug}',
+     False, None),
+    ('recipes_list_author', 'get', '/api/recipes/?author={author_id}',
+     False, None),
+    ('recipes_list_favorited', 'get', '/api/recipes/?is_favorited=1',
+     True, None),
+    ('recipes_list_in_shopping_cart', 'get',
+     '/api/recipes/?is_in_shopping_cart=1', True, None),
+    ('recipe_detail', 'get', '/api/recipes/{recipe_id}/', True, None),
+    ('ingredients_list', 'get', '/api/ingredients/', False, None),
+    ('ingredients_search', 'get', '/api/ingredients/?name={ingredient_name}',
+     False, None),
+    ('tags_list', 'get', '/api/tags/', False, None),
+    ('users_list', 'get', '/api/users/', True, None),
+    ('users_me', 'get', '/api/users/me/', True, None),
+    ('user_detail', 'get', '/api/users/{author_id}/', True, None),
+    ('subscriptions', 'get', '/api/users/subscriptions/?recipes_limit=3',
+     True, None),
+    ('shopping_list_pdf', 'get', '/api/recipes/download_shopping_cart/',
+     True, None),
+    ('shopping_list_csv', 'get',
+     '/api/recipes/download_shopping_cart/?format=csv', True, None),
+    ('favorite_add', 'post', '/api/recipes/{other_recipe_id}/favorite/',
+     True, 'delete'),
+    ('shopping_cart_add', 'post',
+     '/api/recipes/{other_recipe_id}/shopping_cart/', True, 'delete'),
+    ('subscribe', 'post', '/api/users/{other_author_id}/subscribe/',
+     True, 'delete'),
+)
+
+
+def get_percentile(values, percentile):
+    """Перцентиль по методу ближайшего ранга."""
+    values = sorted(values)
+    return values[max(0, math.ceil(percentile / 100 * len(values)) - 1)]
+
+
+class QueryCounter:
+    """Счетчик запросов к базе данных."""
+
+    def __init__(self):
+        """Init метод класса."""
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Подсчет запроса."""
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """Бенчмарк эндпоинтов API через тестовый клиент Django."""
+
+    help = (
+        'Benchmark API endpoints through the Django test client and report '
+        'p50/p95 latency, query counts and memory allocations as JSON'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--endpoints', nargs='*',
+            help='Имена эндпоинтов, по умолчанию все'
+        )
+        parser.add_argument(
+            '--user', type=int,
+            help='Id пользователя, по умолчанию пользователь '
+                 'с наибольшим количеством подписок'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэши перед каждым запросом'
+        )
+        parser.add_argument(
+            '--output', help='Файл для JSON отчета, по умолчанию stdout'
+        )
+
+    def get_context(self, user_id):
+        """Пользователь и id объектов для путей эндпоинтов."""
+        users = User.objects.order_by('id')
+        if user_id is None:
+            user = users.annotate(
+                subscriptions_count=Count('follower')
+            ).order_by('-subscriptions_count', 'id').first()
+        else:
+            user = users.filter(id=user_id).first()
+        recipe = Recipe.objects.order_by('id').first()
+        if user is None or recipe is None:
+            raise CommandError(
+                'Нет данных для бенчмарка, выполните seed_data'
+            )
+        other_recipe = Recipe.objects.exclude(
+            id__in=Favourite.objects.filter(user=user).values('recipe_id')
+        ).exclude(
+            id__in=ShoppingCartRecipe.objects.filter(
+                shopping_cart__author=user
+            ).values('recipe_id')
+        ).order_by('id').first()
+        other_author = users.exclude(id=user.id).exclude(
+            id__in=Subscription.objects.filter(user=user).values('author_id')
+        ).first()
+        ingredient = Ingredient.objects.order_by('name').first()
+        tag = Tag.objects.order_by('id').first()
+        return user, {
+            'recipe_id': recipe.id,
+            'author_id': recipe.author_id,
+            'other_recipe_id': other_recipe.id if other_recipe else 0,
+            'other_author_id': other_author.id if other_author else 0,
+            'ingredient_name': ingredient.name[:3] if ingredient else '',
+            'tag_slug': tag.slug if tag else '',
+        }
+
+    def request(self, client, method, path):
+        """Запрос с чтением всего содержимого ответа."""
+        response = getattr(client, method)(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def run_endpoint(self, client, endpoint, path, options):
+        """Замеры одного эндпоинта."""
+        name, method, _, _, cleanup = endpoint
+        durations = []
+        queries = []
+        for iteration in range(options['warmup'] + options['iterations']):
+            if options['cold']:
+                for cache in caches.all():
+                    cache.clear()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = self.request(client, method, path)
+                duration = (time.perf_counter() - start) * 1000
+            if cleanup:
+                self.request(client, cleanup, path)
+            if iteration >= options['warmup']:
+                durations.append(duration)
+                queries.append(counter.count)
+        tracemalloc.start()
+        self.request(client, method, path)
+        allocated, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if cleanup:
+            self.request(client, cleanup, path)
+        return {
+            'method': method.upper(),
+            'path': path,
+            'status': response.status_code,
+            'p50_ms': round(get_percentile(durations, 50), 3),
+            'p95_ms': round(get_percentile(durations, 95), 3),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'max_ms': round(max(durations), 3),
+            'queries': max(queries),
+            'allocated_kb': round(allocated / 1024, 1),
+            'peak_allocated_kb': round(peak / 1024, 1),
+        }
+
+    def get_dataset_size(self):
+        """Количество объектов основных моделей."""
+        return {
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'ingredients': Ingredient.objects.count(),
+            'favourites': Favourite.objects.count(),
+            'shopping_cart_recipes': ShoppingCartRecipe.objects.count(),
+            'subscriptions': Subscription.objects.count(),
+        }
+
+    def handle(self, *args, **options):
+        """Главная функция."""
+        if options['iterations'] < 1:
+            raise CommandError('Нужна хотя бы одна итерация')
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if not options['endpoints'] or endpoint[0] in options['endpoints']
+        ]
+        user, context = self.get_context(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        clients = {
+            False: Client(),
+            True: Client(HTTP_AUTHORIZATION=f'Token {token.key}'),
+        }
+        setup_test_environment(debug=settings.DEBUG)
+        try:
+            results = {}
+            for endpoint in endpoints:
+                name, _, path, authenticated, _ = endpoint
+                results[name] = self.run_endpoint(
+                    clients[authenticated],
+                    endpoint,
+                    path.format(**context),
+                    options
+                )
+                self.stderr.write(
+                    f'{name}: p50 {results[name]["p50_ms"]} мс, '
+                    f'p95 {results[name]["p95_ms"]} мс, '
+                    f'запросов {results[name]["queries"]}'
+                )
+        finally:
+            teardown_test_environment()
+        report = json.dumps({
+            'meta': {
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'cold': options['cold'],
+                'user_id': user.id,
+                'dataset': self.get_dataset_size(),
+            },
+            'endpoints': results,
+        }, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,20 @@
+"""Удаление устаревших выгрузок списков покупок."""
+from django.core.management.base import BaseCommand
+
+from users.shopping_list import delete_old_exports
+
+
+class Command(BaseCommand):
+    """Удаление устаревших выгрузок списков покупок."""
+
+    help = (
+        'Delete shopping list exports older than SHOPPING_LIST_EXPORT_TTL '
+        'together with their files'
+    )
+
+    def handle(self, *args, **options):
+        """Главная функция."""
+        deleted_count = delete_old_exports()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено выгрузок списков покупок: {deleted_count}'
+        ))
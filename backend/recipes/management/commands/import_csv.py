@@ -1,45 +1,183 @@
-"""Загрузка CSV в базу данных."""
+"""Загрузка CSV и JSON в базу данных."""
 import csv
+import json
 import os
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from django.core.management.base import BaseCommand
 from foodgram_backend.settings import BASE_DIR
-from recipes.models import Ingredient
+from recipes.catalog import CATALOGS
 
 data_folder = os.path.join(BASE_DIR, 'data/')
 ingredients_file = 'ingredients.csv'
-file_name_dict = {
-    'ingredients.csv': Ingredient,
+default_model = 'recipes.Ingredient'
+field_aliases = {
+    'measurement_unit': 'measurement_units',
+}
+json_separators = ' \t\r\n,[]'
+read_chunk_size = 64 * 1024
+
+
+def read_csv(file):
+    """Построчное чтение CSV файла."""
+    yield from csv.DictReader(file)
+
+
+def read_json(file):
+    """Потоковое чтение JSON массива объектов или JSON Lines.
+
+    Файл читается блоками, объекты разбираются по одному
+    по мере поступления данных.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in json_separators:
+            position += 1
+        if position < len(buffer):
+            try:
+                obj, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                continue
+        elif eof:
+            return
+        chunk = file.read(read_chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+readers = {
+    '.csv': read_csv,
+    '.json': read_json,
+    '.jsonl': read_json,
 }
 
 
 class Command(BaseCommand):
-    """Загрузка CSV в базу данных."""
+    """Загрузка CSV и JSON в базу данных."""
 
-    help = 'Import data from CSV files'
+    help = (
+        'Import data from CSV or JSON files. '
+        'Existing rows are skipped, new rows are inserted in batches, '
+        'rows that violate a unique constraint are ignored.'
+    )
 
-    def import_norelatedfield_models(self, *args, **options):
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help=f'Файлы для загрузки, по умолчанию {ingredients_file}'
+        )
+        parser.add_argument(
+            '--model',
+            default=default_model,
+            help='Модель в виде app_label.ModelName'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество объектов в одном bulk_create'
+        )
+        parser.add_argument(
+            '--unique-fields',
+            help=(
+                'Поля через запятую, по которым отсеиваются дубли, '
+                'по умолчанию все поля файла'
+            )
+        )
+        parser.add_argument(
+            '--rename',
+            action='append',
+            default=[],
+            metavar='SOURCE=FIELD',
+            help='Переименование поля файла в поле модели'
+        )
+
+    def get_rows(self, file_path, renames):
         """
-        Загрузка моделей без связанных полей.
+        Строки файла с полями модели.
 
         При загрузке цифр преобразовывает их в int
         """
-        for file_name in file_name_dict:
-            file_path = os.path.join(data_folder, file_name)
-            with open(file_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.DictReader(file)
-                obj = file_name_dict[file_name]
-                obj_count = 0
-                for row in csv_reader:
-                    for key, value in row.items():
-                        if value.isdigit():
-                            row[key] = int(value)
-                    obj.objects.get_or_create(**row)
-                    obj_count += 1
-            self.stdout.write(self.style.SUCCESS(
-                f"Количество созданных записей {file_name}: {obj_count} "
-            ))
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in readers:
+            raise CommandError(f'Неизвестный формат файла: {file_path}')
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for row in readers[extension](file):
+                row = {renames.get(key, key): value
+                       for key, value in row.items()}
+                for key, value in row.items():
+                    if isinstance(value, str) and value.isdigit():
+                        row[key] = int(value)
+                yield row
+
+    def import_file(self, file_path, model, options, renames):
+        """Загрузка одного файла пакетами через bulk_create."""
+        start = time.perf_counter()
+        unique_fields = options['unique_fields']
+        existing = None
+        batch = []
+        created_count = 0
+        skipped_count = 0
+        with transaction.atomic():
+            for row in self.get_rows(file_path, renames):
+                if existing is None:
+                    unique_fields = unique_fields or tuple(row)
+                    existing = {
+                        tuple(str(value) for value in values)
+                        for values in model.objects.values_list(
+                            *unique_fields
+                        )
+                    }
+                key = tuple(str(row.get(field)) for field in unique_fields)
+                if key in existing:
+                    skipped_count += 1
+                    continue
+                existing.add(key)
+                batch.append(model(**row))
+                if len(batch) >= options['batch_size']:
+                    model.objects.bulk_create(batch, ignore_conflicts=True)
+                    created_count += len(batch)
+                    batch = []
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            created_count += len(batch)
+        elapsed = time.perf_counter() - start
+        throughput = (created_count + skipped_count) / elapsed
+        self.stdout.write(self.style.SUCCESS(
+            f'{os.path.basename(file_path)}: создано {created_count}, '
+            f'пропущено {skipped_count}, {throughput:.0f} строк/с'
+        ))
 
     def handle(self, *args, **options):
         """Главная функция."""
-        self.import_norelatedfield_models(self, *args, **options)
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as error:
+            raise CommandError(error)
+        if options['unique_fields']:
+            options['unique_fields'] = tuple(
+                options['unique_fields'].split(',')
+            )
+        renames = dict(field_aliases)
+        for rename in options['rename']:
+            source, _, field = rename.partition('=')
+            renames[source] = field
+        files = options['files'] or [
+            os.path.join(data_folder, ingredients_file)
+        ]
+        for file_path in files:
+            self.import_file(file_path, model, options, renames)
+        if model in CATALOGS:
+            CATALOGS[model].bump_version()
@@ -0,0 +1,22 @@
+"""Объединение дублей ингредиентов."""
+from django.core.management.base import BaseCommand
+
+from recipes.cart_items import rebuild_cart_items
+from recipes.catalog import ingredient_catalog
+from recipes.ingredients import merge_duplicate_ingredients
+
+
+class Command(BaseCommand):
+    """Объединение дублей ингредиентов."""
+
+    help = 'Merge ingredients with the same name and measurement units'
+
+    def handle(self, *args, **options):
+        """Главная функция."""
+        merged_count = merge_duplicate_ingredients()
+        if merged_count:
+            rebuild_cart_items()
+            ingredient_catalog.bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено дублей ингредиентов: {merged_count}'
+        ))
@@ -0,0 +1,32 @@
+"""Обработка изображений рецептов, оставшихся без вариантов."""
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Обработка изображений рецептов, оставшихся без вариантов."""
+
+    help = (
+        'Create resized and recompressed variants for recipe images '
+        'that are pending or failed'
+    )
+
+    def handle(self, *args, **options):
+        """Главная функция."""
+        recipe_ids = list(
+            Recipe.objects.exclude(
+                image_status=Recipe.ImageStatus.DONE
+            ).filter(image__isnull=False).exclude(image='')
+            .values_list('id', flat=True)
+        )
+        for recipe_id in recipe_ids:
+            process_recipe_image(recipe_id)
+        done_count = Recipe.objects.filter(
+            id__in=recipe_ids, image_status=Recipe.ImageStatus.DONE
+        ).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений рецептов: {done_count} '
+            f'из {len(recipe_ids)}'
+        ))
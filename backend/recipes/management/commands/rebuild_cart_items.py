@@ -0,0 +1,17 @@
+"""Пересчет сумм ингредиентов в списках покупок."""
+from django.core.management.base import BaseCommand
+
+from recipes.cart_items import rebuild_cart_items
+
+
+class Command(BaseCommand):
+    """Пересчет сумм ингредиентов в списках покупок."""
+
+    help = 'Rebuild ingredient totals of all shopping carts'
+
+    def handle(self, *args, **options):
+        """Главная функция."""
+        items_count = rebuild_cart_items()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны суммы ингредиентов списков покупок: {items_count}'
+        ))
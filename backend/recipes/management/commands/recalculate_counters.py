@@ -0,0 +1,17 @@
+"""Пересчет счетчиков рецептов."""
+from django.core.management.base import BaseCommand
+
+from recipes.counters import recalculate_counters
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков рецептов."""
+
+    help = 'Recalculate favourite and shopping cart counters of recipes'
+
+    def handle(self, *args, **options):
+        """Главная функция."""
+        recipes_count = recalculate_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны счетчики рецептов: {recipes_count}'
+        ))
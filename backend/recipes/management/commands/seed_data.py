@@ -0,0 +1,75 @@
+"""Создание синтетического набора данных."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.dataset import DATASET_PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    """Создание синтетического набора данных.
+
+    На PostgreSQL строки записываются через COPY FROM STDIN,
+    на остальных базах данных через executemany.
+    """
+
+    help = (
+        'Generate a deterministic synthetic dataset of users, recipes, '
+        'favourites, shopping carts and subscriptions. Ingredients are '
+        'loaded from data/ingredients.csv when the table is empty. '
+        'Popularity of authors and recipes follows a power law.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument(
+            '--favourites-per-user', type=int, default=10,
+            help='Среднее количество избранных рецептов пользователя'
+        )
+        parser.add_argument(
+            '--cart-recipes-per-user', type=int, default=3,
+            help='Среднее количество рецептов в списке покупок'
+        )
+        parser.add_argument(
+            '--subscriptions-per-user', type=int, default=5,
+            help='Среднее количество подписок пользователя'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель степенного закона популярности авторов '
+                 'и рецептов, 0 - равномерное распределение'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        """Главная функция."""
+        if options['recipes'] and not options['users']:
+            raise CommandError('Для рецептов нужен хотя бы один пользователь')
+        if options['skew'] < 0:
+            raise CommandError('Показатель skew не может быть отрицательным')
+        start = time.perf_counter()
+        counts = DatasetGenerator(
+            users=options['users'],
+            recipes=options['recipes'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            tags_per_recipe=options['tags_per_recipe'],
+            favourites_per_user=options['favourites_per_user'],
+            cart_recipes_per_user=options['cart_recipes_per_user'],
+            subscriptions_per_user=options['subscriptions_per_user'],
+            skew=options['skew'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+        ).generate()
+        elapsed = time.perf_counter() - start
+        summary = ', '.join(
+            f'{name} {count}' for name, count in counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {summary} за {elapsed:.1f} с. '
+            f'Пароль пользователей: {DATASET_PASSWORD}'
+        ))
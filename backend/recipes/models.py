@@ -9,6 +9,11 @@ from users.models import User
 class Recipe(models.Model):
     """Модель рецепта."""
 
+    class ImageStatus(models.TextChoices):
+        PENDING = 'pending', 'В обработке'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
     name = models.CharField('Название рецепта', max_length=256, unique=True)
     author = models.ForeignKey(
         User,
@@ -24,6 +29,17 @@ class Recipe(models.Model):
         blank=True,
         default=None
     )
+    image_variants = models.JSONField(
+        'Варианты изображения',
+        default=dict,
+        blank=True
+    )
+    image_status = models.CharField(
+        'Статус обработки изображения',
+        max_length=10,
+        choices=ImageStatus.choices,
+        default=ImageStatus.PENDING
+    )
     text = models.TextField('Инструкции по приготовлению')
     ingredients = models.ManyToManyField(
         'Ingredient',
@@ -39,27 +55,21 @@ class Recipe(models.Model):
         verbose_name='Тэг',
         through='RecipeTag',
         through_fields=('recipe', 'tag'))
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в избранное',
+        default=0,
+        db_index=True
+    )
+    cart_count = models.PositiveIntegerField(
+        'Количество добавлений в список покупок',
+        default=0
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('name',)
 
-    @property
-    def is_favorited(self):
-        """Рецепт в списке избранных."""
-        return self.favourite_recipe.filter(
-            recipe_liker=self.profile_user
-        ).exists()
-
-    @property
-    def is_in_shopping_cart(self):
-        """Рецепт в списке покупок."""
-        shopping_cart = ShoppingCart.objects.get(author=self.profile_user)
-        return self.shopping_cart_recipe.filter(
-            shopping_cart=shopping_cart
-        ).exists()
-
     def __str__(self):
         """Название объекта класса."""
         return self.name
@@ -86,6 +96,41 @@ class ShoppingCart(models.Model):
         ordering = ('id',)
 
 
+class ShoppingListExport(models.Model):
+    """Фоновая выгрузка списка покупок в pdf."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор выгрузки',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_exports'
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    file = models.FileField(
+        'Файл списка покупок',
+        upload_to='shopping_lists/',
+        null=True,
+        blank=True,
+        default=None
+    )
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Выгрузка списка покупок'
+        verbose_name_plural = 'Выгрузки списков покупок'
+        ordering = ('-created',)
+
+
 class Ingredient(models.Model):
     """Модель ингредиента."""
 
@@ -96,6 +141,11 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_units'],
+                name='unique_ingredient',
+            )]
 
 
 class Tag(models.Model):
@@ -130,6 +180,14 @@ class RecipeIngredient(models.Model):
         default=0
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                include=['amount'],
+                name='unique_recipe_ingredient',
+            )]
+
 
 class RecipeTag(models.Model):
     """Модель связи рецепта и тэга."""
@@ -137,6 +195,13 @@ class RecipeTag(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'tag'],
+                name='unique_recipe_tag',
+            )]
+
 
 class ShoppingCartRecipe(models.Model):
     """Список покупок."""
@@ -149,6 +214,41 @@ class ShoppingCartRecipe(models.Model):
         related_name='shopping_cart'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['shopping_cart', 'recipe'],
+                name='unique_shopping_cart_recipe',
+            )]
+
+
+class ShoppingCartItem(models.Model):
+    """Сумма количества ингредиента по рецептам списка покупок."""
+
+    shopping_cart = models.ForeignKey(
+        ShoppingCart,
+        on_delete=models.CASCADE,
+        related_name='items'
+    )
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    amount = models.DecimalField(
+        'Количество ингредиента',
+        max_digits=12,
+        decimal_places=3,
+        default=0
+    )
+    recipes_count = models.IntegerField(
+        'Количество рецептов с ингредиентом',
+        default=0
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['shopping_cart', 'ingredient'],
+                name='unique_shopping_cart_item',
+            )]
+
 
 class Favourite(models.Model):
     """Избранные рецепты."""
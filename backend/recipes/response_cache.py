@@ -0,0 +1,143 @@
+"""Кэш ответов чтения рецептов.
+
+Выдача рецептов без учета пользователя хранится в кэше
+RECIPE_CACHE_ALIAS. Ключ ответа содержит адрес запроса и версии
+справочников тэгов и ингредиентов, авторов и рецептов. Версии
+хранятся в общем кэше и меняются после фиксации транзакции,
+изменившей рецепт, его тэги, ингредиенты или данные автора.
+Добавление в избранное меняет только версию порядка
+по популярности: от избранного выдача зависит лишь при
+сортировке по счетчику.
+
+Флаги 'в избранных', 'в списке покупок' и 'подписан' для
+авторизованного пользователя подставляются поверх ответа из кэша.
+"""
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.renderers import JSONRenderer
+
+from recipes.catalog import ingredient_catalog, tag_catalog
+from recipes.models import (
+    Favourite,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCartRecipe
+)
+from recipes.versions import (
+    AUTHORS_VERSION_KEY,
+    POPULARITY_VERSION_KEY,
+    bump_recipes_version,
+    bump_versions,
+    get_versions
+)
+from users.models import Subscription, User
+from utils.constants.constants import RECIPE_CACHE_ALIAS, RECIPE_CACHE_TIMEOUT
+from utils.metrics_util.prometheus import record_cache
+
+USER_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def is_cacheable(request):
+    """Выдача не зависит от пользователя.
+
+    Фильтры по избранному и списку покупок авторизованного
+    пользователя кэшем не обслуживаются.
+    """
+    return request.user.is_anonymous or not any(
+        name in request.query_params for name in USER_FILTERS
+    )
+
+
+def get_cache_key(request, version_keys):
+    """Ключ ответа по адресу запроса и версиям данных."""
+    versions = [
+        ingredient_catalog.get_version(),
+        tag_catalog.get_version(),
+        *get_versions([AUTHORS_VERSION_KEY, *version_keys]),
+    ]
+    query = sorted(request.query_params.lists())
+    payload = json.dumps(
+        [request.build_absolute_uri(request.path), query, versions]
+    )
+    return f'recipe-response:{hashlib.md5(payload.encode()).hexdigest()}'
+
+
+def get_cached_data(request, version_keys, get_data):
+    """Данные ответа из кэша или из get_data с записью в кэш."""
+    response_cache = caches[RECIPE_CACHE_ALIAS]
+    key = get_cache_key(request, version_keys)
+    content = response_cache.get(key)
+    record_cache(RECIPE_CACHE_ALIAS, content is not None)
+    if content is not None:
+        return json.loads(content)
+    data = get_data()
+    response_cache.set(
+        key, JSONRenderer().render(data), RECIPE_CACHE_TIMEOUT
+    )
+    return data
+
+
+def overlay_user_flags(user, recipes):
+    """Подстановка флагов пользователя в выдачу рецептов."""
+    if user.is_anonymous or not recipes:
+        return
+    recipe_ids = [recipe['id'] for recipe in recipes]
+    favorited = set(
+        Favourite.objects.filter(user=user, recipe_id__in=recipe_ids)
+        .values_list('recipe_id', flat=True)
+    )
+    in_shopping_cart = set(
+        ShoppingCartRecipe.objects.filter(
+            shopping_cart__author=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)
+    )
+    subscribed = set(
+        Subscription.objects.filter(
+            user=user,
+            author_id__in={recipe['author']['id'] for recipe in recipes}
+        ).values_list('author_id', flat=True)
+    )
+    for recipe in recipes:
+        recipe['is_favorited'] = recipe['id'] in favorited
+        recipe['is_in_shopping_cart'] = recipe['id'] in in_shopping_cart
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in subscribed
+        )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def bump_recipe(**kwargs):
+    """Новая версия рецептов при изменении рецепта."""
+    bump_recipes_version()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def bump_related_recipe(**kwargs):
+    """Новая версия рецептов при изменении связей рецепта."""
+    bump_recipes_version()
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_delete, sender=Favourite)
+def bump_popularity(**kwargs):
+    """Новая версия порядка по популярности."""
+    bump_versions(POPULARITY_VERSION_KEY)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_authors(update_fields=None, **kwargs):
+    """Новая версия авторов, кроме записи времени входа."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_versions(AUTHORS_VERSION_KEY)
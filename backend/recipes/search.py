@@ -0,0 +1,116 @@
+"""Поиск ингредиентов по названию.
+
+На PostgreSQL поиск выполняется базой данных по триграммному
+GIN индексу (расширение pg_trgm). На остальных базах данных
+используется индекс n-грамм в памяти процесса.
+"""
+from collections import defaultdict
+from threading import Lock
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+from recipes.catalog import ingredient_catalog
+from recipes.ingredients import get_table
+from recipes.models import Ingredient
+from utils.constants.constants import NGRAM_MAX_LENGTH
+
+TRIGRAM_INDEX_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS {index} '
+    'ON {table} USING gin (UPPER(name) gin_trgm_ops)',
+)
+
+
+def get_ngrams(text, length):
+    """Все подстроки text заданной длины."""
+    return {text[i:i + length] for i in range(len(text) - length + 1)}
+
+
+class IngredientIndex:
+    """Индекс n-грамм названий ингредиентов в памяти процесса.
+
+    Хранит для каждой подстроки длиной до NGRAM_MAX_LENGTH
+    множество id ингредиентов, в названии которых она встречается,
+    и названия ингредиентов для проверки более длинных запросов.
+    Индекс строится при первом поиске и перестраивается при
+    смене версии справочника ингредиентов.
+    """
+
+    def __init__(self):
+        """Init метод класса."""
+        self.lock = Lock()
+        self.version = None
+        self.ngrams = None
+        self.names = None
+
+    def build(self):
+        """Построение индекса по всем ингредиентам."""
+        ngrams = defaultdict(set)
+        names = {}
+        for pk, name in Ingredient.objects.values_list('id', 'name'):
+            name = name.lower()
+            names[pk] = name
+            for length in range(1, NGRAM_MAX_LENGTH + 1):
+                for ngram in get_ngrams(name, length):
+                    ngrams[ngram].add(pk)
+        return ngrams, names
+
+    def search(self, name):
+        """Множество id ингредиентов, название которых содержит name."""
+        version = ingredient_catalog.get_version()
+        with self.lock:
+            if self.version != version:
+                self.ngrams, self.names = self.build()
+                self.version = version
+            ngrams = self.ngrams
+            names = self.names
+        name = name.lower()
+        if len(name) <= NGRAM_MAX_LENGTH:
+            return ngrams.get(name, set())
+        postings = sorted(
+            (ngrams.get(ngram, set())
+             for ngram in get_ngrams(name, NGRAM_MAX_LENGTH)),
+            key=len
+        )
+        # Пересечение дает только кандидатов: n-граммы запроса могут
+        # встречаться в названии не подряд.
+        return {
+            pk for pk in set.intersection(*postings) if name in names[pk]
+        }
+
+
+ingredient_index = IngredientIndex()
+
+
+def create_trigram_index(**kwargs):
+    """Создание триграммного индекса названий на PostgreSQL."""
+    if connection.vendor != 'postgresql':
+        return
+    names = {
+        'index': connection.ops.quote_name(
+            f'{Ingredient._meta.db_table}_name_trgm'
+        ),
+        'table': get_table(Ingredient),
+    }
+    with connection.cursor() as cursor:
+        for sql in TRIGRAM_INDEX_SQL:
+            cursor.execute(sql.format(**names))
+
+
+def search_ingredients(queryset, name):
+    """Ингредиенты, в названии которых есть name.
+
+    Раньше в выдаче находятся элементы с совпадающим началом.
+    """
+    if connection.vendor == 'postgresql':
+        queryset = queryset.filter(name__icontains=name)
+    else:
+        queryset = queryset.filter(id__in=ingredient_index.search(name))
+    return queryset.annotate(
+        starts_with_search=Case(
+            When(name__startswith=name, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField()
+        )
+    ).order_by('starts_with_search', 'name')
@@ -3,13 +3,12 @@
 from datetime import timedelta
 
 from django.db import transaction
-from django.shortcuts import get_object_or_404
-
-from drf_base64.fields import Base64ImageField
 
 from rest_framework import serializers
 
 
+from recipes.cart_items import change_recipe_ingredients
+from recipes.images import enqueue_image
 from recipes.models import (
     Ingredient,
     Recipe,
@@ -24,6 +23,14 @@ from users.serializers import UserSerializer
 from utils.constants.constants import (
     SECONDS_IN_MINUTE
 )
+from utils.image_util.image_fields import (
+    Base64ImageField,
+    ImageVariantsField
+)
+from utils.image_util.image_process import (
+    delete_image_files,
+    get_variant_names
+)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -76,7 +83,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         coerce_to_string=False
     )
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         fields = (
@@ -99,6 +106,13 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     cooking_time = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
+
+    def to_representation(self, instance):
+        """Передача аннотированного свойства 'подписан' автору рецепта."""
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
 
     def get_cooking_time(self, instance):
         """Преобразование объекта timedelta в целое число минут."""
@@ -107,14 +121,26 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
-        """Получение свойства 'в избранных'."""
+        """Получение свойства 'в избранных'.
+
+        Берется из аннотации RecipeViewSet, запрос выполняется
+        только для неаннотированного рецепта.
+        """
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         if not self.context['request'].user.is_anonymous:
             user = self.context['request'].user
             return obj.favourite_recipe.filter(user=user).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
-        """Получение свойства 'в списке покупок'."""
+        """Получение свойства 'в списке покупок'.
+
+        Берется из аннотации RecipeViewSet, запрос выполняется
+        только для неаннотированного рецепта.
+        """
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if not user.is_anonymous:
             return ShoppingCartRecipe.objects.filter(
@@ -133,6 +159,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
+            'image_status',
             'text',
             'cooking_time'
         )
@@ -166,6 +194,53 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         model = Recipe
         depth = 1
 
+    def validate_tags(self, value):
+        """Запрет повторяющихся тэгов."""
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError(
+                'Тэги рецепта не должны повторяться'
+            )
+        return value
+
+    def validate_ingredients(self, value):
+        """Проверка ингредиентов одним запросом.
+
+        Заменяет id ингредиентов на объекты Ingredient.
+        """
+        ingredient_ids = [ingredient_data['id'] for ingredient_data in value]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Ингредиенты рецепта не должны повторяться'
+            )
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        for ingredient_data in value:
+            ingredient = ingredients.get(ingredient_data['id'])
+            if ingredient is None:
+                raise serializers.ValidationError(
+                    f'Ингредиент {ingredient_data["id"]} не найден'
+                )
+            ingredient_data['id'] = ingredient
+        return value
+
+    @staticmethod
+    def create_tags(recipe, tags):
+        """Добавление тэгов рецепта одним запросом."""
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in tags
+        )
+
+    @staticmethod
+    def create_ingredients(recipe, ingredients_data):
+        """Добавление ингредиентов рецепта одним запросом."""
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredient_data['id'],
+                amount=ingredient_data['amount']
+            )
+            for ingredient_data in ingredients_data
+        )
+
     @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта."""
@@ -173,19 +248,80 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
+        self.create_tags(recipe, tags_data)
+        self.create_ingredients(recipe, ingredients_data)
+        if recipe.image:
+            enqueue_image(recipe)
+        return recipe
 
-        for tag in tags_data:
-            RecipeTag.objects.create(recipe=recipe, tag=tag)
-        for ingredient_data in ingredients_data:
-            amount = ingredient_data.get('amount')
-            ingredient_id = ingredient_data.get('id').id
-            recipe_ingredient = get_object_or_404(Ingredient, id=ingredient_id)
-            RecipeIngredient.objects.create(
-                ingredient=recipe_ingredient,
-                recipe=recipe,
-                amount=amount
+    def update_tags(self, instance, tags_data):
+        """Изменение тэгов рецепта.
+
+        Удаляются и добавляются только изменившиеся тэги.
+        """
+        current_ids = set(
+            RecipeTag.objects.filter(recipe=instance)
+            .values_list('tag_id', flat=True)
+        )
+        new_ids = {tag.id for tag in tags_data}
+        if current_ids - new_ids:
+            RecipeTag.objects.filter(
+                recipe=instance,
+                tag_id__in=current_ids - new_ids
+            ).delete()
+        self.create_tags(
+            instance, [tag for tag in tags_data if tag.id not in current_ids]
+        )
+
+    def update_ingredients(self, instance, ingredients_data):
+        """Изменение ингредиентов рецепта.
+
+        Удаляются, изменяются и добавляются только изменившиеся
+        ингредиенты, разница переносится в суммы списков покупок.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=instance
             )
-        return recipe
+        }
+        new_ids = {
+            ingredient_data['id'].id for ingredient_data in ingredients_data
+        }
+        removed_ids = [
+            recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in new_ids
+        ]
+        if removed_ids:
+            RecipeIngredient.objects.filter(id__in=removed_ids).delete()
+        cart_changes = [
+            (ingredient_id, -recipe_ingredient.amount, -1)
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in new_ids
+        ]
+        changed = []
+        created = []
+        for ingredient_data in ingredients_data:
+            ingredient_id = ingredient_data['id'].id
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient is None:
+                created.append(ingredient_data)
+                cart_changes.append(
+                    (ingredient_id, ingredient_data['amount'], 1)
+                )
+            elif recipe_ingredient.amount != ingredient_data['amount']:
+                cart_changes.append((
+                    ingredient_id,
+                    ingredient_data['amount'] - recipe_ingredient.amount,
+                    0
+                ))
+                recipe_ingredient.amount = ingredient_data['amount']
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        self.create_ingredients(instance, created)
+        change_recipe_ingredients(instance.id, cart_changes)
 
     @transaction.atomic
     def update(self, instance, validated_data):
@@ -198,23 +334,26 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         tags_data = validated_data.get('tags')
         if tags_data:
-            instance.tags.set(tags_data)
+            self.update_tags(instance, tags_data)
 
         ingredients_data = validated_data.get('ingredients')
         if ingredients_data:
-            instance.ingredients.clear()
-            for ingredient_data in ingredients_data:
-                amount = ingredient_data.get('amount')
-                ingredient_id = ingredient_data.get('id').id
-                recipe_ingredient = get_object_or_404(
-                    Ingredient, id=ingredient_id
-                )
-                RecipeIngredient.objects.create(
-                    ingredient=recipe_ingredient,
-                    recipe=instance,
-                    amount=amount
-                )
-        instance.save()
+            self.update_ingredients(instance, ingredients_data)
+
+        update_fields = ['name', 'text', 'cooking_time']
+        image = validated_data.get('image')
+        if image:
+            old_names = [
+                instance.image.name,
+                *get_variant_names(instance.image_variants)
+            ]
+            instance.image = image
+            instance.image_variants = {}
+            instance.image_status = Recipe.ImageStatus.PENDING
+            update_fields += ['image', 'image_variants', 'image_status']
+            transaction.on_commit(lambda: delete_image_files(old_names))
+            enqueue_image(instance)
+        instance.save(update_fields=update_fields)
         return instance
 
     def to_representation(self, instance):
@@ -0,0 +1,642 @@
+"""Тесты приложения recipes."""
+import base64
+import io
+import json
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+
+from PIL import Image
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from recipes.cart_items import rebuild_cart_items
+from recipes.counters import fill_counters, recalculate_counters
+from recipes.images import fill_image_status, process_recipe_image
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    ShoppingCartItem,
+    ShoppingCartRecipe,
+    Tag
+)
+from recipes.search import search_ingredients
+from users.models import Subscription, User
+from users.shopping_list import get_shopping_list
+from utils.image_util.image_fields import Base64ImageField
+from utils.metrics_util.request_metrics import registry
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pdf': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+    'recipes': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+RESPONSE_CACHES = {
+    **TEST_CACHES,
+    'recipes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recipes-test',
+    },
+}
+
+
+def create_recipes(author, count, ingredients, tags):
+    """Рецепты автора с ингредиентами и тэгами."""
+    recipes = [
+        Recipe.objects.create(
+            name=f'Рецепт {author.id}-{number}',
+            author=author,
+            text='Текст',
+            cooking_time=timedelta(minutes=10)
+        )
+        for number in range(count)
+    ]
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in tags
+    )
+    return recipes
+
+
+def get_client(user):
+    """Клиент пользователя с токеном."""
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecipeListQueriesTest(TestCase):
+    """Количество запросов списка рецептов без кэша ответов."""
+
+    # Токен пользователя, COUNT, страница рецептов с авторами,
+    # ингредиенты, тэги, затем избранное, список покупок и подписки
+    # пользователя для флагов выдачи.
+    LIST_QUERIES = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        """Рецепты двух авторов с ингредиентами, тэгами и связями."""
+        cls.user = User.objects.create(username='user', email='u@ex.com')
+        authors = [
+            User.objects.create(username=f'author{i}', email=f'a{i}@ex.com')
+            for i in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {i}',
+                                      measurement_units='г')
+            for i in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тэг {i}', slug=f'tag{i}')
+            for i in range(2)
+        ]
+        recipes = [
+            recipe
+            for author in authors
+            for recipe in create_recipes(author, 60, ingredients, tags)
+        ]
+        Subscription.objects.create(user=cls.user, author=authors[0])
+        cart = ShoppingCart.objects.create(author=cls.user)
+        for recipe in recipes[::10]:
+            Favourite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCartRecipe.objects.create(
+                shopping_cart=cart, recipe=recipe
+            )
+
+    def setUp(self):
+        """Авторизованный клиент и пустые кэши."""
+        for cache in caches.all():
+            cache.clear()
+        self.client = get_client(self.user)
+
+    def assert_list_queries(self, limit):
+        """Страница из limit рецептов за LIST_QUERIES запросов."""
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get(f'/api/recipes/?limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+
+    def test_small_page(self):
+        """Страница из 6 рецептов."""
+        self.assert_list_queries(6)
+
+    def test_large_page(self):
+        """Страница из 100 рецептов, запросов столько же."""
+        self.assert_list_queries(100)
+
+
+@override_settings(CACHES=RESPONSE_CACHES)
+class RecipeResponseCacheTest(TestCase):
+    """Кэш ответов чтения рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Рецепты автора с ингредиентом и тэгом, пользователь."""
+        cls.author = User.objects.create(username='author', email='a@ex.com')
+        cls.user = User.objects.create(username='user', email='u@ex.com')
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_units='г'
+        )
+        cls.tag = Tag.objects.create(name='Тэг', slug='tag')
+        cls.recipes = create_recipes(
+            cls.author, 2, [cls.ingredient], [cls.tag]
+        )
+
+    def setUp(self):
+        """Пустые кэши."""
+        for cache in caches.all():
+            cache.clear()
+
+    def get_recipe(self, client=None, recipe=None):
+        """Рецепт из выдачи списка анонимному или другому клиенту."""
+        recipe = recipe or self.recipes[0]
+        results = (client or self.client).get('/api/recipes/').data['results']
+        return next(data for data in results if data['id'] == recipe.id)
+
+    def test_anonymous_cache_hits(self):
+        """Повторные список и рецепт отдаются без запросов к базе."""
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipes[0].id}/'):
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.client.get(url).json(), first)
+
+    def test_user_flags_overlay(self):
+        """Флаги пользователя подставляются поверх общей выдачи."""
+        Favourite.objects.create(user=self.user, recipe=self.recipes[0])
+        cart = ShoppingCart.objects.create(author=self.user)
+        ShoppingCartRecipe.objects.create(
+            shopping_cart=cart, recipe=self.recipes[1]
+        )
+        Subscription.objects.create(user=self.user, author=self.author)
+        self.assertFalse(self.get_recipe()['is_favorited'])
+        client = get_client(self.user)
+        # Токен, избранное, список покупок и подписки поверх кэша.
+        with self.assertNumQueries(4):
+            favourite = self.get_recipe(client)
+        in_cart = self.get_recipe(client, self.recipes[1])
+        self.assertEqual(
+            (favourite['is_favorited'], favourite['is_in_shopping_cart']),
+            (True, False)
+        )
+        self.assertEqual(
+            (in_cart['is_favorited'], in_cart['is_in_shopping_cart']),
+            (False, True)
+        )
+        self.assertTrue(favourite['author']['is_subscribed'])
+        self.assertFalse(self.get_recipe()['author']['is_subscribed'])
+
+    def test_favourite_keeps_list_cache(self):
+        """Избранное меняет только выдачу по популярности."""
+        url = '/api/recipes/?ordering=-popularity'
+        self.client.get('/api/recipes/')
+        self.assertEqual(
+            self.client.get(url).data['results'][0]['id'], self.recipes[0].id
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            get_client(self.user).post(
+                f'/api/recipes/{self.recipes[1].id}/favorite/'
+            )
+        with self.assertNumQueries(0):
+            self.client.get('/api/recipes/')
+        self.assertEqual(
+            self.client.get(url).data['results'][0]['id'], self.recipes[1].id
+        )
+
+    def test_edits_invalidate_cache(self):
+        """Изменения рецепта, тэга, ингредиента и автора видны сразу."""
+        edits = (
+            (self.recipes[0], 'name', 'Новое название',
+             lambda data: data['name']),
+            (self.tag, 'name', 'Новый тэг',
+             lambda data: data['tags'][0]['name']),
+            (self.ingredient, 'name', 'сахар',
+             lambda data: data['ingredients'][0]['name']),
+            (self.author, 'first_name', 'Автор',
+             lambda data: data['author']['first_name']),
+        )
+        detail_url = f'/api/recipes/{self.recipes[0].id}/'
+        for instance, field, value, get_value in edits:
+            with self.subTest(model=type(instance).__name__):
+                self.get_recipe()
+                self.client.get(detail_url)
+                with self.captureOnCommitCallbacks(execute=True):
+                    setattr(instance, field, value)
+                    instance.save()
+                self.assertEqual(get_value(self.get_recipe()), value)
+                self.assertEqual(
+                    get_value(self.client.get(detail_url).data), value
+                )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecipeCountersTest(TestCase):
+    """Счетчики избранного и списков покупок рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Автор, рецепты и пользователи."""
+        cls.author = User.objects.create(username='author', email='a@ex.com')
+        cls.users = [
+            User.objects.create(username=f'user{i}', email=f'u{i}@ex.com')
+            for i in range(2)
+        ]
+        cls.recipes = create_recipes(cls.author, 3, [], [])
+
+    def get_counters(self, recipe):
+        """Счетчики рецепта из базы данных."""
+        recipe.refresh_from_db()
+        return recipe.favorites_count, recipe.cart_count
+
+    def test_api_changes_counters(self):
+        """Добавление и удаление через API меняет счетчики."""
+        recipe = self.recipes[0]
+        for user in self.users:
+            client = get_client(user)
+            client.post(f'/api/recipes/{recipe.id}/favorite/')
+            client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(self.get_counters(recipe), (2, 2))
+        client.delete(f'/api/recipes/{recipe.id}/favorite/')
+        client.delete(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(self.get_counters(recipe), (1, 1))
+
+    def test_cascade_delete_changes_counters(self):
+        """Удаление пользователя уменьшает счетчики его рецептов."""
+        recipe = self.recipes[0]
+        cart = ShoppingCart.objects.create(author=self.users[0])
+        Favourite.objects.create(user=self.users[0], recipe=recipe)
+        ShoppingCartRecipe.objects.create(shopping_cart=cart, recipe=recipe)
+        self.users[0].delete()
+        self.assertEqual(self.get_counters(recipe), (0, 0))
+
+    def test_recalculate_and_fill_counters(self):
+        """Пересчет восстанавливает счетчики, записанные без сигналов."""
+        Favourite.objects.bulk_create(
+            Favourite(user=user, recipe=self.recipes[1])
+            for user in self.users
+        )
+        fill_counters()
+        self.assertEqual(self.get_counters(self.recipes[1]), (2, 0))
+        Recipe.objects.update(favorites_count=5)
+        recalculate_counters()
+        self.assertEqual(self.get_counters(self.recipes[0]), (0, 0))
+        self.assertEqual(self.get_counters(self.recipes[1]), (2, 0))
+
+    def test_popularity_ordering_is_stable(self):
+        """Рецепты с одинаковым счетчиком упорядочены по id."""
+        Favourite.objects.create(user=self.users[0], recipe=self.recipes[2])
+        response = get_client(self.users[0]).get(
+            '/api/recipes/?ordering=-popularity'
+        )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[2].id, self.recipes[0].id, self.recipes[1].id]
+        )
+
+    def test_popularity_ordering_with_cursor(self):
+        """Курсорная выдача идет в порядке популярности."""
+        Favourite.objects.create(user=self.users[0], recipe=self.recipes[1])
+        client = get_client(self.users[0])
+        expected = [
+            recipe['id'] for recipe in client.get(
+                '/api/recipes/?ordering=-popularity'
+            ).data['results']
+        ]
+        ids = []
+        url = '/api/recipes/?ordering=-popularity&pagination=cursor&limit=1'
+        while url:
+            data = client.get(url).data
+            ids += [recipe['id'] for recipe in data['results']]
+            url = data['next']
+        self.assertEqual(ids, expected)
+        self.assertEqual(ids[0], self.recipes[1].id)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class IngredientSearchTest(TestCase):
+    """Поиск ингредиентов по индексу n-грамм на SQLite."""
+
+    NAMES = (
+        'абрикосовый сок', 'Осока', 'сок', 'Соль', 'соль морская',
+        'сахар', 'оливковое масло', 'Молоко', 'солод', 'ок',
+    )
+    QUERIES = (
+        'осок', 'сок', 'ок', 'о', 'с', 'со', 'сол', 'соль', 'Соль',
+        'СОК', 'абрикос', 'овый', 'во', ' ', 'масло', 'к', 'x', 'сокс',
+        'оль м', 'солод', 'молоко',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        """Ингредиенты с общими n-граммами."""
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_units='г')
+            for name in cls.NAMES
+        )
+
+    def setUp(self):
+        """Новая версия справочника для построения индекса."""
+        for cache in caches.all():
+            cache.clear()
+
+    def test_search_matches_substring(self):
+        """Результат совпадает с поиском подстроки без учета регистра."""
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                self.assertEqual(
+                    set(
+                        search_ingredients(Ingredient.objects.all(), query)
+                        .values_list('name', flat=True)
+                    ),
+                    {
+                        name for name in self.NAMES
+                        if query.lower() in name.lower()
+                    }
+                )
+
+    def test_ngrams_not_in_a_row(self):
+        """N-граммы запроса в названии не подряд не дают совпадения."""
+        self.assertEqual(
+            list(
+                search_ingredients(Ingredient.objects.all(), 'осок')
+                .values_list('name', flat=True)
+            ),
+            ['Осока']
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ShoppingCartItemsTest(TestCase):
+    """Суммы ингредиентов в списках покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Автор, покупатели, ингредиенты и рецепты."""
+        cls.author = User.objects.create(username='author', email='a@ex.com')
+        cls.buyers = [
+            User.objects.create(username=f'buyer{i}', email=f'b{i}@ex.com')
+            for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {i}',
+                                      measurement_units='г')
+            for i in range(4)
+        ]
+        cls.recipes = create_recipes(cls.author, 2, cls.ingredients[:3], [])
+
+    def add_to_carts(self, recipe):
+        """Рецепт в списках покупок всех покупателей через API."""
+        for buyer in self.buyers:
+            get_client(buyer).post(
+                f'/api/recipes/{recipe.id}/shopping_cart/'
+            )
+
+    def assert_items_match(self):
+        """Суммы совпадают с агрегацией ингредиентов рецептов списков."""
+        for cart in ShoppingCart.objects.all():
+            expected = set(
+                RecipeIngredient.objects
+                .filter(recipe__shopping_cart__shopping_cart=cart)
+                .values_list('ingredient_id')
+                .annotate(Sum('amount'), Count('id'))
+            )
+            actual = set(
+                ShoppingCartItem.objects.filter(shopping_cart=cart)
+                .values_list('ingredient_id', 'amount', 'recipes_count')
+            )
+            self.assertEqual(actual, expected)
+
+    def test_add_and_remove_recipes(self):
+        """Добавление и удаление рецептов из списка через API."""
+        for recipe in self.recipes:
+            self.add_to_carts(recipe)
+        self.assert_items_match()
+        self.assertEqual(
+            list(get_shopping_list(self.buyers[0]))[0],
+            ['ингредиент 0', '2', 'г']
+        )
+        get_client(self.buyers[0]).delete(
+            f'/api/recipes/{self.recipes[0].id}/shopping_cart/'
+        )
+        self.assert_items_match()
+
+    def test_json_export_amounts(self):
+        """Количество в выгрузке json - число."""
+        self.add_to_carts(self.recipes[0])
+        self.add_to_carts(self.recipes[1])
+        response = get_client(self.buyers[0]).get(
+            '/api/recipes/download_shopping_cart/?format=json'
+        )
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content))[0],
+            {'name': 'ингредиент 0', 'amount': 2, 'measurement_unit': 'г'}
+        )
+
+    def test_recipe_ingredients_change(self):
+        """Изменение ингредиентов рецепта меняет суммы всех списков."""
+        self.add_to_carts(self.recipes[0])
+        self.add_to_carts(self.recipes[1])
+        response = get_client(self.author).patch(
+            f'/api/recipes/{self.recipes[0].id}/',
+            {'ingredients': [
+                {'id': self.ingredients[1].id, 'amount': 5},
+                {'id': self.ingredients[2].id, 'amount': 1},
+                {'id': self.ingredients[3].id, 'amount': 2},
+            ]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_items_match()
+
+    def test_recipe_and_user_delete(self):
+        """Каскадное удаление рецепта и покупателя."""
+        self.add_to_carts(self.recipes[0])
+        self.add_to_carts(self.recipes[1])
+        self.recipes[0].delete()
+        self.assert_items_match()
+        self.buyers[0].delete()
+        self.assert_items_match()
+        self.assertEqual(ShoppingCartItem.objects.count(), 3)
+
+    def test_rebuild(self):
+        """Пересчет после записи рецептов в список без сигналов."""
+        cart = ShoppingCart.objects.create(author=self.buyers[0])
+        ShoppingCartRecipe.objects.bulk_create(
+            ShoppingCartRecipe(shopping_cart=cart, recipe=recipe)
+            for recipe in self.recipes
+        )
+        self.assertEqual(rebuild_cart_items(), 3)
+        self.assert_items_match()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImageStatusTest(TestCase):
+    """Статус обработки изображений существующих рецептов."""
+
+    def test_fill_image_status(self):
+        """Рецепты без изображения не остаются в обработке."""
+        author = User.objects.create(username='author', email='a@ex.com')
+        without_image, with_image = create_recipes(author, 2, [], [])
+        Recipe.objects.filter(id=with_image.id).update(image='old.png')
+        fill_image_status()
+        self.assertEqual(
+            dict(Recipe.objects.values_list('id', 'image_status')),
+            {
+                without_image.id: Recipe.ImageStatus.DONE,
+                with_image.id: Recipe.ImageStatus.PENDING,
+            }
+        )
+
+    def process_failing_image(self, replace_image):
+        """Статус после ошибки обработки изображения рецепта.
+
+        При replace_image изображение заменяется во время обработки.
+        """
+        author = User.objects.create(username='author', email='a@ex.com')
+        recipe = create_recipes(author, 1, [], [])[0]
+
+        def fail(image, upload_to):
+            if replace_image:
+                Recipe.objects.filter(id=recipe.id).update(
+                    image='recipes/images/new.png'
+                )
+            raise OSError
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root), \
+                mock.patch('recipes.images.save_image_variants', fail), \
+                mock.patch('recipes.images.connection'), \
+                self.assertLogs('recipes.images', 'ERROR'):
+            recipe.image = default_storage.save(
+                'recipes/images/old.png', ContentFile(b'old')
+            )
+            recipe.save()
+            process_recipe_image(recipe.id)
+        recipe.refresh_from_db()
+        return recipe.image_status
+
+    def test_failed_processing(self):
+        """Ошибка обработки отмечается у того же изображения."""
+        self.assertEqual(
+            self.process_failing_image(replace_image=False),
+            Recipe.ImageStatus.FAILED
+        )
+
+    def test_failed_processing_of_replaced_image(self):
+        """Ошибка обработки старого изображения не отмечается у нового."""
+        self.assertEqual(
+            self.process_failing_image(replace_image=True),
+            Recipe.ImageStatus.PENDING
+        )
+
+
+def get_image_data(size, image_format='PNG'):
+    """Изображение в виде строки data:image в base64."""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/{image_format.lower()};base64,{encoded}'
+
+
+class Base64ImageFieldTest(TestCase):
+    """Проверки изображения в base64."""
+
+    def assert_fails(self, data, code):
+        """Ошибка проверки с кодом code."""
+        with self.assertRaises(ValidationError) as context:
+            Base64ImageField().to_internal_value(data)
+        self.assertEqual(context.exception.detail[0].code, code)
+
+    def test_valid_image(self):
+        """Изображение декодируется во временный файл."""
+        uploaded = Base64ImageField().to_internal_value(
+            get_image_data((30, 20))
+        )
+        self.assertTrue(uploaded.name.endswith('.png'))
+        with Image.open(uploaded.file) as image:
+            self.assertEqual(image.size, (30, 20))
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=100)
+    def test_byte_limit(self):
+        """Файл больше IMAGE_UPLOAD_MAX_BYTES."""
+        self.assert_fails(get_image_data((300, 300), 'BMP'), 'too_large')
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_pixel_limit(self):
+        """Изображение больше IMAGE_UPLOAD_MAX_PIXELS пикселей."""
+        self.assert_fails(get_image_data((20, 20)), 'too_many_pixels')
+
+    def test_decompression_bomb(self):
+        """Изображение больше предела Pillow."""
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            self.assert_fails(get_image_data((20, 20)), 'too_many_pixels')
+
+    def test_invalid_base64(self):
+        """Неверная строка base64 и строка без base64."""
+        for data in (
+            'data:image/png;base64,aGVsbG8é',
+            'data:image/png;base64,@@@@',
+            'data:image/png,aGVsbG8=',
+        ):
+            with self.subTest(data=data):
+                self.assert_fails(data, 'invalid')
+
+    def test_not_image(self):
+        """Строка base64 не с изображением."""
+        self.assert_fails('data:image/png;base64,aGVsbG8=', 'invalid_image')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MetricsRoutesTest(TestCase):
+    """Маршруты в метриках запросов не задаются клиентом."""
+
+    def test_client_methods_and_paths(self):
+        """Произвольные методы и пути записываются под общими именами."""
+        routes = set(registry.routes)
+        for number in range(5):
+            self.client.generic(f'METHOD{number}', f'/nope{number}/')
+            self.client.generic(f'METHOD{number}', '/api/recipes/')
+            self.client.get(f'/nope{number}/')
+        expected = {
+            'OTHER unresolved',
+            'OTHER recipes:recipes-list',
+            'GET unresolved',
+        }
+        self.assertEqual(set(registry.routes) - routes, expected - routes)
+
+    def test_prometheus_route_labels(self):
+        """Метки маршрутов Prometheus не содержат методов клиента."""
+        for number in range(5):
+            self.client.generic(f'METHOD{number}', f'/nope{number}/')
+        admin = User.objects.create(
+            username='admin', email='admin@ex.com', is_staff=True
+        )
+        content = get_client(admin).get('/api/metrics').content.decode()
+        self.assertIn('route="OTHER unresolved"', content)
+        self.assertNotIn('route="METHOD', content)
@@ -0,0 +1,38 @@
+"""Версии данных рецептов для ключей кэша ответов.
+
+Версия - время последнего изменения, хранится в общем кэше.
+Версий немного: одна у всех рецептов, одна у порядка
+по популярности и одна у авторов. Версии отдельных рецептов
+не хранятся, файловый кэш с сотнями тысяч ключей удалял бы
+при записи случайную треть из них вместе с общими версиями.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+RECIPES_VERSION_KEY = 'recipes:version'
+POPULARITY_VERSION_KEY = 'recipes:popularity:version'
+AUTHORS_VERSION_KEY = 'recipes:authors:version'
+
+
+def get_versions(keys):
+    """Версии по ключам, отсутствующие версии создаются."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*keys):
+    """Новые версии после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: cache.set_many(dict.fromkeys(keys, time.time()), None)
+    )
+
+
+def bump_recipes_version():
+    """Новая версия рецептов."""
+    bump_versions(RECIPES_VERSION_KEY)
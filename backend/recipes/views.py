@@ -1,6 +1,7 @@
 """Вьюсеты для Recipes API."""
 
 from django.core.exceptions import PermissionDenied
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
 
 from django_filters import rest_framework as djangofilters
 
@@ -8,11 +9,19 @@ from rest_framework.response import Response
 from rest_framework import (
     mixins,
     permissions,
+    status,
     viewsets,
 )
 
-from .filters import IngredientFilter
+from .catalog import ingredient_catalog, tag_catalog
+from .filters import IngredientFilter, RecipeFilter
+from .response_cache import (
+    get_cached_data,
+    is_cacheable,
+    overlay_user_flags
+)
 
+from .versions import POPULARITY_VERSION_KEY, RECIPES_VERSION_KEY
 from .serializers import (
     IngredientSerializer,
     RecipeReadSerializer,
@@ -21,13 +30,21 @@ from .serializers import (
 )
 
 from recipes.models import (
+    Favourite,
     Ingredient,
     Recipe,
+    RecipeIngredient,
+    ShoppingCartRecipe,
     Tag
 )
+from users.models import Subscription
+from utils.constants.constants import ORDERING_PARAM
+from utils.metrics_util.mixins import InstrumentedViewMixin
+from utils.pagination.pagination import OptionalCursorPagination
 
 
 class IngredientViewSet(
+    InstrumentedViewMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
@@ -41,37 +58,139 @@ class IngredientViewSet(
     filter_backends = (djangofilters.DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """Список ингредиентов.
+
+        Полный список отдается из кэша справочника,
+        поиск по названию выполняется фильтром.
+        """
+        if request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return ingredient_catalog.response(request)
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """Рецепт для API."""
 
     queryset = Recipe.objects.all()
     permission_classes = (permissions.IsAuthenticatedOrReadOnly, )
+    pagination_class = OptionalCursorPagination
+    filterset_class = RecipeFilter
+    lookup_value_regex = r'\d+'
+    user_flags = True
 
     def get_queryset(self):
-        """Чтение рецептов с фильтрацией.
+        """Чтение рецептов.
 
-        Фильтрация по тэгам, нахождению в корзине покупок,
-        нахождению в избранных.
+        Фильтрация по тэгам, автору, нахождению в корзине покупок
+        и в избранных выполняется RecipeFilter.
         """
         queryset = super().get_queryset()
-        is_in_shopping_cart = (
-            self.request.query_params.get('is_in_shopping_cart')
+        if self.action in ('list', 'retrieve'):
+            queryset = self.prepare_for_read(queryset)
+        return queryset
+
+    def prepare_for_read(self, queryset):
+        """Загрузка связанных объектов и свойств для выдачи рецептов."""
+        return self.annotate_user_flags(
+            self.prefetch_related_objects(queryset)
+        )
+
+    def get_read_data(self, recipe):
+        """Рецепт в виде ответа RecipeReadSerializer."""
+        recipe = self.prepare_for_read(
+            Recipe.objects.filter(pk=recipe.pk)
+        ).get()
+        return RecipeReadSerializer(
+            recipe,
+            context=self.get_serializer_context()
+        ).data
+
+    def prefetch_related_objects(self, queryset):
+        """План загрузки связанных объектов рецепта.
+
+        Автор загружается в основном запросе, ингредиенты и тэги
+        отдельными запросами на всю страницу выдачи.
+        """
+        return queryset.select_related('author').prefetch_related(
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+            'tags'
         )
-        is_favorited = self.request.query_params.get('is_favorited')
-        tags = self.request.GET.getlist('tags')
 
-        if is_in_shopping_cart:
-            queryset = Recipe.objects.filter(
-                shoppingcart__author=self.request.user
+    def annotate_user_flags(self, queryset):
+        """Аннотация свойств 'в избранных', 'в списке покупок', 'подписан'.
+
+        Флаги вычисляются подзапросами Exists в основном запросе,
+        для анонимного пользователя и для выдачи в кэш ответов
+        подставляется константа False.
+        """
+        user = self.request.user
+        if user.is_anonymous or not self.user_flags:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                author_is_subscribed=Value(False, output_field=BooleanField())
             )
-        if is_favorited:
-            queryset = Recipe.objects.filter(
-                favourite_recipe__user=self.request.user
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favourite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCartRecipe.objects.filter(
+                    shopping_cart__author=user,
+                    recipe=OuterRef('pk')
+                )
+            ),
+            author_is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=user,
+                    author=OuterRef('author')
+                )
             )
-        if tags:
-            queryset = queryset.filter(tags__slug__in=tags)
-        return queryset.distinct()
+        )
+
+    def get_cached_data(self, version_keys, get_data):
+        """Выдача без учета пользователя из кэша ответов."""
+        def get_base_data():
+            self.user_flags = False
+            return get_data().data
+        return get_cached_data(self.request, version_keys, get_base_data)
+
+    def list(self, request, *args, **kwargs):
+        """Список рецептов.
+
+        Выдача берется из кэша ответов, флаги авторизованного
+        пользователя подставляются поверх нее. Порядок выдачи
+        по популярности зависит еще и от версии избранного.
+        """
+        if not is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+        version_keys = [RECIPES_VERSION_KEY]
+        if request.query_params.get(ORDERING_PARAM):
+            version_keys.append(POPULARITY_VERSION_KEY)
+        data = self.get_cached_data(
+            version_keys,
+            lambda: super(RecipeViewSet, self).list(request, *args, **kwargs)
+        )
+        overlay_user_flags(
+            request.user,
+            data if isinstance(data, list) else data['results']
+        )
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Рецепт из кэша ответов с флагами пользователя."""
+        data = self.get_cached_data(
+            [RECIPES_VERSION_KEY],
+            lambda: super(RecipeViewSet, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+        overlay_user_flags(request.user, [data])
+        return Response(data)
 
     def get_serializer_class(self):
         """Выбор сериалайзера в зависимости от метода запроса."""
@@ -79,27 +198,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def create(self, request, *args, **kwargs):
+        """Создание рецепта через API."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe = serializer.save()
+        return Response(
+            self.get_read_data(recipe),
+            status=status.HTTP_201_CREATED
+        )
+
     def partial_update(self, request, pk):
         """Исправление рецепта через API."""
         recipe = self.get_object()
-        if recipe.author != self.request.user:
+        if recipe.author_id != self.request.user.id:
             raise PermissionDenied('Изменение чужого контента запрещено!')
 
-        serializer = RecipeWriteSerializer(
+        serializer = self.get_serializer(
             recipe,
             data=request.data,
             partial=True
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        read_serializer = RecipeReadSerializer(
-            serializer.instance,
-            context={'request': self.request, }
-        )
-        return Response(read_serializer.data)
+        return Response(self.get_read_data(serializer.instance))
 
 
 class TagViewSet(
+    InstrumentedViewMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
@@ -110,3 +236,7 @@ class TagViewSet(
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (permissions.AllowAny,)
+
+    def list(self, request, *args, **kwargs):
+        """Список тэгов из кэша справочника."""
+        return tag_catalog.response(request)
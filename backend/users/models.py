@@ -18,11 +18,6 @@ class User(AbstractUser):
         """Название объекта класса."""
         return self.username
 
-    @property
-    def is_subscribed(self):
-        """Свойство 'подписан на автора'."""
-        return self.follower.filter(author=self.profile_user).exists()
-
 
 class Subscription(models.Model):
     """Подписка."""
@@ -1,13 +1,16 @@
 """Сериализаторы для приложения Users."""
 
+from django.db import IntegrityError, transaction
 from django.forms import ValidationError
 
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from recipes.models import (
     Favourite,
     Recipe,
     ShoppingCartRecipe,
+    ShoppingListExport,
 )
 from users.models import (
     Subscription,
@@ -16,29 +19,53 @@ from users.models import (
 from utils.constants.constants import (
     SECONDS_IN_MINUTE
 )
+from utils.image_util.image_fields import ImageVariantsField
 
 
-class FavouriteSerializer(serializers.ModelSerializer):
+def get_recipes_limit(request):
+    """Значение параметра recipes_limit или None."""
+    recipes_limit = request.query_params.get('recipes_limit', '')
+    if recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
+
+class UniqueCreateMixin:
+    """Создание объекта с проверкой повтора уникальным индексом.
+
+    Повтор определяется по ошибке вставки, а не отдельным
+    запросом перед ней, поэтому одновременные запросы
+    не создают дублей.
+    """
+
+    unique_error_message = None
+
+    def create(self, validated_data):
+        """Создание объекта или ошибка валидации при повторе."""
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.unique_error_message
+                ]
+            })
+
+
+class FavouriteSerializer(UniqueCreateMixin, serializers.ModelSerializer):
     """Сериализатор избранных рецептов."""
 
+    unique_error_message = 'Добавить рецепт в избранное можно только один раз'
+
     def to_representation(self, obj):
         """Вывод данных в выдачу."""
         recipe = obj.recipe
-        read_serializer = RecipeSubscriptionReadSerializer(recipe).data
+        read_serializer = RecipeSubscriptionReadSerializer(
+            recipe, context=self.context
+        ).data
         return read_serializer
 
-    def validate(self, data):
-        """Запрет повторного добавления в избранное."""
-        recipe = data.get('recipe')
-        user = data.get('user')
-        if Favourite.objects.filter(
-                user=user, recipe=recipe
-        ).exists():
-            raise ValidationError(
-                'Добавить рецепт в избранное можно только один раз'
-            )
-        return data
-
     class Meta:
         fields = ('recipe', 'user')
         model = Favourite
@@ -64,20 +91,15 @@ class ShoppingCartReadSerializer(serializers.ModelSerializer):
         model = ShoppingCartRecipe
 
 
-class ShoppingCartWriteSerializer(serializers.ModelSerializer):
+class ShoppingCartWriteSerializer(
+    UniqueCreateMixin,
+    serializers.ModelSerializer
+):
     """Сериализатор для добавления рецепта в список покупок."""
 
-    def validate(self, data):
-        """Запрет повторного добавления рецепта в список покупок."""
-        recipe = data.get('recipe')
-        shopping_cart = data.get('shopping_cart')
-        if ShoppingCartRecipe.objects.filter(
-                shopping_cart=shopping_cart, recipe=recipe
-        ).exists():
-            raise ValidationError(
-                'Добавить рецепт в список покупок можно только один раз'
-            )
-        return data
+    unique_error_message = (
+        'Добавить рецепт в список покупок можно только один раз'
+    )
 
     name = serializers.CharField(source='recipe.name', read_only=True)
     image = serializers.ImageField(source='recipe.image', read_only=True)
@@ -91,6 +113,15 @@ class ShoppingCartWriteSerializer(serializers.ModelSerializer):
         model = ShoppingCartRecipe
 
 
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    """Сериализатор фоновой выгрузки списка покупок."""
+
+    class Meta:
+        fields = ('id', 'status', 'file', 'created')
+        read_only_fields = fields
+        model = ShoppingListExport
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для модели User."""
 
@@ -138,7 +169,12 @@ class UserSerializer(serializers.ModelSerializer):
         return data
 
     def get_is_subscribed(self, obj):
-        """Получение свойства 'подписан'."""
+        """Получение свойства 'подписан'.
+
+        Используется заранее вычисленное значение, если оно есть.
+        """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         if not self.context['request'].user.is_anonymous:
             return obj.following.filter(
                 user=self.context['request'].user
@@ -164,6 +200,7 @@ class RecipeSubscriptionReadSerializer(serializers.ModelSerializer):
     """Сериалайзер рецепта для выдачи в подписке."""
 
     cooking_time = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     def get_cooking_time(self, instance):
         """Преобразование объекта timedelta в целое число минут."""
@@ -176,30 +213,26 @@ class RecipeSubscriptionReadSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time'
         )
         model = Recipe
         depth = 1
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(UniqueCreateMixin, serializers.ModelSerializer):
     """Сериалайзер создания подписок."""
 
+    unique_error_message = 'Подписаться на пользователя можно только один раз'
+
     def validate(self, data):
-        """Запрет повторных подписок и подписок на себя."""
+        """Запрет подписок на себя."""
         author = data.get('author')
         user = data.get('user')
         if user == author:
             raise ValidationError(
                 'Нельзя подписаться на самого себя'
             )
-        if Subscription.objects.filter(
-                user=user,
-                author=author
-        ).exists():
-            raise ValidationError(
-                'Подписаться на пользователя можно только один раз'
-            )
         return data
 
     class Meta:
@@ -211,17 +244,34 @@ class SubscriptionReadSerializer(serializers.ModelSerializer):
     """Сериалайзер чтения подписок."""
 
     def to_representation(self, obj):
-        """Вывод данных в выдачу."""
+        """Вывод данных в выдачу.
+
+        Рецепты и их количество берутся из подготовленных
+        SubscriptionsViewSet данных, если они есть.
+        """
+        request = self.context['request']
         author = obj.author
+        if obj.user_id == request.user.id:
+            author.is_subscribed = True
         user_data = UserSerializer(author, context=self.context).data
+        if hasattr(author, 'feed_recipes'):
+            recipes = author.feed_recipes
+        else:
+            recipes = author.recipe_author.all()
+            recipes_limit = get_recipes_limit(request)
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         user_data['recipes'] = RecipeSubscriptionReadSerializer(
-            author.recipe_author,
+            recipes,
             many=True,
             context=self.context
         ).data
-        user_data['recipes_count'] = (
-            Recipe.objects.filter(author=author).count()
-        )
+        if hasattr(obj, 'recipes_count'):
+            user_data['recipes_count'] = obj.recipes_count
+        else:
+            user_data['recipes_count'] = (
+                Recipe.objects.filter(author=author).count()
+            )
         return user_data
 
     class Meta:
@@ -0,0 +1,113 @@
+"""Список покупок: суммирование ингредиентов и фоновая выгрузка в pdf."""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.models import ShoppingCartItem, ShoppingListExport
+from utils.constants.constants import (
+    EXPORT_FILENAME,
+    PAGEINFO,
+    TITLE
+)
+from utils.pdf_util.pdf_cache import get_cached_pdf, get_pdf_hash
+from utils.pdf_util.pdf_create import PdfCreator
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.SHOPPING_LIST_EXPORT_WORKERS,
+    thread_name_prefix='shopping-list-export'
+)
+
+
+def get_shopping_list(user):
+    """Строки списка покупок.
+
+    Суммы ингредиентов хранятся в ShoppingCartItem, поэтому
+    список читается по индексу списка покупок без агрегации
+    по рецептам, строки выдаются по мере чтения из базы данных.
+    """
+    ingredients = (
+        ShoppingCartItem.objects
+        .filter(shopping_cart__author=user)
+        .values_list(
+            'ingredient__name', 'ingredient__measurement_units', 'amount'
+        )
+        .order_by('ingredient__name')
+    )
+    for name, measurement_units, total_amount in ingredients.iterator():
+        yield [
+            name,
+            total_amount.normalize().to_eng_string(),
+            measurement_units
+        ]
+
+
+def get_pdf_table(user):
+    """Строки таблицы pdf, для пустого списка одна пустая строка."""
+    return list(get_shopping_list(user)) or [[None] * 3]
+
+
+def render_export(export_id):
+    """Создание pdf файла выгрузки в пуле потоков."""
+    try:
+        export = ShoppingListExport.objects.select_related('author').get(
+            id=export_id
+        )
+        data = get_pdf_table(export.author)
+        pdf = PdfCreator(
+            Title=TITLE,
+            pageinfo=PAGEINFO,
+            data=[]
+        )
+        content = get_cached_pdf(pdf, data, get_pdf_hash(pdf, data))
+        export.file.save(
+            f'{EXPORT_FILENAME}-{uuid.uuid4().hex}.pdf',
+            ContentFile(content),
+            save=False
+        )
+        export.status = ShoppingListExport.Status.DONE
+        export.save(update_fields=('file', 'status'))
+    except Exception:
+        logger.exception('Ошибка выгрузки списка покупок %s', export_id)
+        ShoppingListExport.objects.filter(id=export_id).update(
+            status=ShoppingListExport.Status.FAILED
+        )
+    finally:
+        connection.close()
+
+
+def enqueue_export(export):
+    """Поставить выгрузку в очередь после фиксации транзакции."""
+    transaction.on_commit(lambda: executor.submit(render_export, export.id))
+
+
+def delete_export_files(names):
+    """Удаление файлов выгрузок из хранилища."""
+    for name in names:
+        default_storage.delete(name)
+
+
+def delete_old_exports(**filters):
+    """Удаление выгрузок старше SHOPPING_LIST_EXPORT_TTL вместе с файлами.
+
+    Файлы удаляются после фиксации транзакции. Возвращает число
+    удаленных выгрузок.
+    """
+    exports = ShoppingListExport.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=settings.SHOPPING_LIST_EXPORT_TTL
+        ),
+        **filters
+    )
+    names = [name for name in exports.values_list('file', flat=True) if name]
+    deleted_count, _ = exports.delete()
+    transaction.on_commit(lambda: delete_export_files(names))
+    return deleted_count
@@ -8,6 +8,7 @@ from users.views import (
     FavouriteViewSet,
     ShoppingCartViewSet,
     ShoppingCartPrintViewSet,
+    ShoppingListExportViewSet,
     SubscriptionsViewSet,
     UserViewSet
 )
@@ -19,6 +20,7 @@ router.register(
     r'recipes/(?P<recipe_id>\d+)/shopping_cart',
     ShoppingCartViewSet
 )
+router.register(r'recipes/shopping_list_exports', ShoppingListExportViewSet)
 router.register(r'users/subscriptions', SubscriptionsViewSet)
 router.register(r'users/(?P<user_id>\d+)/subscribe', SubscriptionsViewSet)
 router.register(r'users', UserViewSet)
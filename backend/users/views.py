@@ -2,8 +2,12 @@
 
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import update_session_auth_hash
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
 
 from rest_framework import (
+    mixins,
     permissions,
     status,
     viewsets,
@@ -13,26 +17,42 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from utils.constants.constants import (
+    PDF_FORMAT,
     TITLE,
     PAGEINFO
 )
 
+from .shopping_list import (
+    delete_old_exports,
+    enqueue_export,
+    get_pdf_table,
+    get_shopping_list
+)
 from .serializers import (
     FavouriteSerializer,
     ShoppingCartReadSerializer,
     ShoppingCartWriteSerializer,
+    ShoppingListExportSerializer,
     SubscriptionSerializer,
     SubscriptionReadSerializer,
     UserCreateSerializer,
-    UserSerializer
+    UserSerializer,
+    get_recipes_limit
+)
+from utils.export_util.export_create import (
+    EXPORT_FORMATS,
+    create_streaming_response
 )
+from utils.metrics_util.mixins import InstrumentedViewMixin
+from utils.pagination.pagination import OptionalCursorPagination
+from utils.pdf_util.pdf_cache import get_cached_pdf, get_pdf_hash
 from utils.pdf_util.pdf_create import PdfCreator
 from recipes.models import (
     Favourite,
     Recipe,
-    RecipeIngredient,
     ShoppingCart,
     ShoppingCartRecipe,
+    ShoppingListExport,
 )
 from users.models import (
     Subscription,
@@ -40,11 +60,12 @@ from users.models import (
 )
 
 
-class FavouriteViewSet(viewsets.ModelViewSet):
+class FavouriteViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """Вьюсет избранных рецептов."""
 
     queryset = Favourite.objects.all()
     serializer_class = FavouriteSerializer
+    pagination_class = OptionalCursorPagination
 
     def create(self, request, *args, **kwargs):
         """Добавить рецепт в избранное."""
@@ -82,7 +103,7 @@ class FavouriteViewSet(viewsets.ModelViewSet):
         return super().get_queryset().filter(user=user)
 
 
-class ShoppingCartViewSet(viewsets.ModelViewSet):
+class ShoppingCartViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """Список покупок для API."""
 
     queryset = ShoppingCart.objects.all()
@@ -142,7 +163,7 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ShoppingCartPrintViewSet(APIView):
+class ShoppingCartPrintViewSet(InstrumentedViewMixin, APIView):
     """Вьюсет списка покупок."""
 
     def get_queryset(self, request):
@@ -151,55 +172,82 @@ class ShoppingCartPrintViewSet(APIView):
 
         return super().get_queryset().filter(author=user)
 
+    def perform_content_negotiation(self, request, force=False):
+        """Параметр format выбирает формат файла, а не рендерер."""
+        return super().perform_content_negotiation(request, force=True)
+
     def get(self, request):
-        """Создание pdf списка покупок."""
-        cart = ShoppingCart.objects.filter(author=request.user)
-        list_to_buy = {}
-        shopping_cart_recipes = (
-            ShoppingCartRecipe.objects.filter(shopping_cart=cart[0])
-        )
-        for shopping_cart_recipe in shopping_cart_recipes:
-            recipe_id = shopping_cart_recipe.recipe.id
-            recipe_ingredients = (
-                RecipeIngredient.objects.filter(recipe_id=recipe_id)
+        """Выгрузка списка покупок.
+
+        Формат задается параметром format: pdf (по умолчанию),
+        csv, txt или json. Текстовые форматы отдаются потоком.
+        """
+        export_format = request.query_params.get('format', PDF_FORMAT)
+        if export_format in EXPORT_FORMATS:
+            return create_streaming_response(
+                get_shopping_list(request.user),
+                export_format
             )
-            for recipe_ingredient in recipe_ingredients:
-                ingredient = recipe_ingredient.ingredient.name
-                amount = recipe_ingredient.amount
-                measurement_units = (
-                    recipe_ingredient.ingredient.measurement_units
-                )
-                if ingredient in list_to_buy:
-                    list_amount = list_to_buy[ingredient][0]
-                    list_to_buy[ingredient][0] = list_amount + amount
-                else:
-                    list_to_buy[ingredient] = [amount, measurement_units]
-
-            list_to_print = []
-            for element in list_to_buy:
-                amount = list_to_buy[element][0].normalize()
-                measurement_units = list_to_buy[element][1]
-                list_to_print.append(
-                    [element, amount.to_eng_string(),
-                     measurement_units
-                     ])
+        if export_format != PDF_FORMAT:
+            return Response(
+                {'error': f'Неизвестный формат файла: {export_format}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        list_to_print = get_pdf_table(request.user)
         pdf = PdfCreator(
             Title=TITLE,
             pageinfo=PAGEINFO,
             data=[]
         )
-        empty_list_to_print = [[None] * 3]
-        if list_to_print:
-            return pdf.create_pdf_with_table(list_to_print)
-        else:
-            return pdf.create_pdf_with_table(empty_list_to_print)
+        pdf_hash = get_pdf_hash(pdf, list_to_print)
+        etag = quote_etag(pdf_hash)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return HttpResponseNotModified(headers={'ETag': etag})
+        response = pdf.create_response(
+            get_cached_pdf(pdf, list_to_print, pdf_hash)
+        )
+        response['ETag'] = etag
+        return response
+
+
+class ShoppingListExportViewSet(
+    InstrumentedViewMixin,
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet
+):
+    """Вьюсет фоновой выгрузки списка покупок в pdf.
 
+    POST ставит выгрузку в очередь, GET по id возвращает её статус
+    и ссылку на готовый файл.
+    """
 
-class SubscriptionsViewSet(viewsets.ModelViewSet):
+    queryset = ShoppingListExport.objects.all()
+    serializer_class = ShoppingListExportSerializer
+
+    def get_queryset(self):
+        """Выгрузки текущего пользователя."""
+        user = self.request.user
+        return super().get_queryset().filter(author=user)
+
+    def create(self, request, *args, **kwargs):
+        """Поставить выгрузку списка покупок в очередь.
+
+        Устаревшие выгрузки пользователя удаляются вместе с файлами.
+        """
+        delete_old_exports(author=request.user)
+        export = ShoppingListExport.objects.create(author=request.user)
+        enqueue_export(export)
+        serializer = self.get_serializer(export)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class SubscriptionsViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """Вьюсет подписок."""
 
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionReadSerializer
+    pagination_class = OptionalCursorPagination
 
     def create(self, request, *args, **kwargs):
         """Подписаться."""
@@ -235,12 +283,45 @@ class SubscriptionsViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def get_queryset(self):
-        """Получение подписок через API."""
+        """Получение подписок через API.
+
+        Количество рецептов автора считается в основном запросе,
+        рецепты всех авторов страницы загружаются одним запросом,
+        не более recipes_limit на автора. Порядок задан явно:
+        с GROUP BY от Count Django не применяет Meta.ordering.
+        """
         user = self.request.user
-        return super().get_queryset().filter(user=user)
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time',
+            'author_id'
+        )
+        recipes_limit = get_recipes_limit(self.request)
+        if recipes_limit is not None:
+            recipes = recipes.filter(
+                id__in=Subquery(
+                    Recipe.objects
+                    .filter(author=OuterRef('author'))
+                    .order_by('name')
+                    .values('id')[:recipes_limit]
+                )
+            )
+        return (
+            super().get_queryset()
+            .filter(user=user)
+            .select_related('author')
+            .annotate(recipes_count=Count('author__recipe_author'))
+            .order_by('-created', 'id')
+            .prefetch_related(
+                Prefetch(
+                    'author__recipe_author',
+                    queryset=recipes,
+                    to_attr='feed_recipes'
+                )
+            )
+        )
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """Вьюсет пользователя."""
 
     queryset = User.objects.all()
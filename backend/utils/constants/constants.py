@@ -3,3 +3,35 @@
 TITLE = 'Список покупок'
 PAGEINFO = 'Foodgram project by Ivan Evdokimov'
 SECONDS_IN_MINUTE = 60
+PDF_FORMAT = 'pdf'
+EXPORT_FILENAME = 'shopping-list'
+EXPORT_HEADER = ('Ингредиент', 'Количество', 'Единицы измерения')
+PDF_TEMPLATE_VERSION = 1
+PDF_CACHE_ALIAS = 'pdf'
+PDF_CACHE_TIMEOUT = 60 * 60 * 24
+NGRAM_MAX_LENGTH = 3
+CURSOR_PAGINATION = 'cursor'
+ORDERING_PARAM = 'ordering'
+MAX_PAGE_SIZE = 100
+IMAGE_SIZES = {
+    'thumbnail': 480,
+    'detail': 1200,
+}
+IMAGE_MAIN_VARIANT = 'detail'
+IMAGE_MAIN_FORMAT = 'jpeg'
+IMAGE_SAVE_OPTIONS = {
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True,
+             'progressive': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'avif': {'format': 'AVIF', 'quality': 60},
+}
+IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
+IMAGE_SPOOL_MAX_SIZE = 1024 * 1024
+IMAGE_ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF', 'AVIF')
+RECIPE_CACHE_ALIAS = 'recipes'
+RECIPE_CACHE_TIMEOUT = 60 * 60
+METRICS_HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+METRICS_PERCENTILES = (50, 95, 99)
+PROMETHEUS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
@@ -0,0 +1,75 @@
+"""Потоковая выгрузка списка покупок в текстовых форматах."""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from utils.constants.constants import (
+    EXPORT_FILENAME,
+    EXPORT_HEADER,
+    TITLE
+)
+
+
+class EchoBuffer:
+    """Псевдобуфер для csv.writer.
+
+    Вместо записи возвращает строку, чтобы её можно было
+    сразу отдать клиенту.
+    """
+
+    def write(self, value):
+        """Вернуть записанную строку."""
+        return value
+
+
+def stream_csv(rows):
+    """Строки списка покупок в формате csv."""
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_txt(rows):
+    """Строки списка покупок простым текстом."""
+    yield f'{TITLE}\n\n'
+    for name, amount, measurement_units in rows:
+        yield f'{name} ({measurement_units}) — {amount}\n'
+
+
+def stream_json(rows):
+    """Список покупок в виде json массива.
+
+    Количество выдается числом, как в остальных ответах API.
+    """
+    yield '['
+    separator = ''
+    for name, amount, measurement_units in rows:
+        yield separator + json.dumps(
+            {
+                'name': name,
+                'amount': float(amount),
+                'measurement_unit': measurement_units
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'txt': (stream_txt, 'text/plain; charset=utf-8'),
+    'json': (stream_json, 'application/json; charset=utf-8'),
+}
+
+
+def create_streaming_response(rows, export_format):
+    """Создать потоковый ответ с файлом списка покупок."""
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(rows), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{EXPORT_FILENAME}.{export_format}"'
+    )
+    return response
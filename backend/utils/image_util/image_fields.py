@@ -0,0 +1,133 @@
+"""Поля сериализаторов для изображений."""
+import base64
+import uuid
+import warnings
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+
+from PIL import Image, UnidentifiedImageError
+
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+
+from utils.constants.constants import (
+    IMAGE_ALLOWED_FORMATS,
+    IMAGE_DECODE_CHUNK_SIZE,
+    IMAGE_SPOOL_MAX_SIZE
+)
+
+BASE64_SEPARATOR = ';base64,'
+
+
+class Base64ImageField(serializers.ImageField):
+    """Изображение в виде строки data:image/...;base64,...
+
+    Строка декодируется блоками во временный файл, который
+    переносится на диск после IMAGE_SPOOL_MAX_SIZE байт.
+    Размер файла проверяется до и во время декодирования,
+    размеры изображения - по заголовку файла до декодирования
+    пикселей. Ссылка на уже загруженное изображение пропускается.
+    """
+
+    default_error_messages = {
+        'invalid': 'Изображение должно быть строкой data:image в base64',
+        'too_large': 'Размер изображения больше {max_bytes} байт',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей',
+        'invalid_image': 'Файл не является изображением допустимого формата',
+    }
+
+    def decode(self, data, offset):
+        """Декодирование base64 блоками во временный файл.
+
+        Блоки берутся срезами data начиная с offset, строка
+        base64 целиком не копируется.
+        """
+        max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+        if (len(data) - offset) // 4 * 3 > max_bytes + 2:
+            self.fail('too_large', max_bytes=max_bytes)
+        file = SpooledTemporaryFile(max_size=IMAGE_SPOOL_MAX_SIZE)
+        size = 0
+        try:
+            for start in range(offset, len(data), IMAGE_DECODE_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    data[start:start + IMAGE_DECODE_CHUNK_SIZE],
+                    validate=True
+                )
+                size += len(chunk)
+                if size > max_bytes:
+                    self.fail('too_large', max_bytes=max_bytes)
+                file.write(chunk)
+        except ValueError:
+            # binascii.Error при неверных символах base64,
+            # ValueError при символах не из ASCII.
+            file.close()
+            self.fail('invalid')
+        except serializers.ValidationError:
+            file.close()
+            raise
+        file.seek(0)
+        return file, size
+
+    def check_image(self, file):
+        """Проверка формата и размеров изображения по заголовку."""
+        max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+                image = Image.open(file)
+            with image:
+                if image.format not in IMAGE_ALLOWED_FORMATS:
+                    self.fail('invalid_image')
+                width, height = image.size
+                if width * height > max_pixels:
+                    self.fail('too_many_pixels', max_pixels=max_pixels)
+                image.verify()
+                image_format = image.format
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=max_pixels)
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            self.fail('invalid_image')
+        file.seek(0)
+        return image_format
+
+    def to_internal_value(self, data):
+        """Временный файл с проверенным изображением."""
+        if isinstance(data, str) and data.startswith('http'):
+            raise SkipField()
+        if not isinstance(data, str) or not data.startswith('data:'):
+            self.fail('invalid')
+        index = data.find(BASE64_SEPARATOR)
+        if index < 0:
+            self.fail('invalid')
+        file, size = self.decode(data, index + len(BASE64_SEPARATOR))
+        try:
+            image_format = self.check_image(file)
+        except serializers.ValidationError:
+            file.close()
+            raise
+        return UploadedFile(
+            file=file,
+            name=f'{uuid.uuid4()}.{image_format.lower()}',
+            content_type=Image.MIME.get(image_format),
+            size=size
+        )
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на варианты изображения по размерам и форматам."""
+
+    def to_representation(self, value):
+        """Замена имен файлов на абсолютные ссылки."""
+        request = self.context.get('request')
+        urls = {}
+        for name, formats in (value or {}).items():
+            urls[name] = {}
+            for image_format, file_name in formats.items():
+                url = default_storage.url(file_name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[name][image_format] = url
+        return urls
@@ -0,0 +1,116 @@
+"""Обработка загруженных изображений.
+
+Изображение декодируется один раз, поворачивается по EXIF,
+очищается от метаданных и сохраняется в нескольких размерах
+и форматах. AVIF используется, если его поддерживает Pillow
+или установлен pillow-avif-plugin.
+"""
+import uuid
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from PIL import Image, ImageOps, features
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+from utils.constants.constants import (
+    IMAGE_MAIN_FORMAT,
+    IMAGE_MAIN_VARIANT,
+    IMAGE_SAVE_OPTIONS,
+    IMAGE_SIZES
+)
+
+
+def get_image_formats():
+    """Форматы, в которых сохраняются изображения."""
+    Image.init()
+    formats = ['jpeg']
+    if features.check('webp'):
+        formats.append('webp')
+    if 'AVIF' in Image.SAVE:
+        formats.append('avif')
+    return formats
+
+
+def open_image(image_file):
+    """Декодирование изображения в RGB без метаданных.
+
+    JPEG сразу декодируется в уменьшенном масштабе, если
+    он не меньше наибольшего из размеров вариантов.
+    """
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        max_size = max(IMAGE_SIZES.values())
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    image.info = {}
+    return image
+
+
+def create_image_variants(image_file):
+    """Содержимое всех размеров и форматов изображения.
+
+    Размеры уменьшаются по очереди от большего к меньшему,
+    каждый следующий получается из предыдущего.
+    """
+    image = open_image(image_file)
+    formats = get_image_formats()
+    variants = {}
+    for name, size in sorted(
+        IMAGE_SIZES.items(), key=lambda item: item[1], reverse=True
+    ):
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        variants[name] = {}
+        for image_format in formats:
+            buffer = BytesIO()
+            image.save(buffer, **IMAGE_SAVE_OPTIONS[image_format])
+            variants[name][image_format] = buffer.getvalue()
+    return variants
+
+
+def save_image_variants(image_file, upload_to):
+    """Сохранение вариантов изображения в хранилище.
+
+    Возвращает имя основного файла и словарь имен файлов
+    вариантов по размерам и форматам.
+    """
+    stem = uuid.uuid4().hex
+    names = {}
+    for name, contents in create_image_variants(image_file).items():
+        names[name] = {
+            image_format: default_storage.save(
+                f'{upload_to}{stem}_{name}.{image_format}',
+                ContentFile(content)
+            )
+            for image_format, content in contents.items()
+        }
+    return names[IMAGE_MAIN_VARIANT][IMAGE_MAIN_FORMAT], names
+
+
+def delete_image_files(names):
+    """Удаление файлов изображения из хранилища."""
+    for name in names:
+        if name:
+            default_storage.delete(name)
+
+
+def get_variant_names(variants):
+    """Имена всех файлов вариантов изображения."""
+    return [
+        name
+        for formats in variants.values()
+        for name in formats.values()
+    ]
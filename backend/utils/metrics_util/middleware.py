@@ -0,0 +1,120 @@
+"""Middleware метрик запросов."""
+import logging
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.views import View
+
+from utils.metrics_util.prometheus import record_request
+from utils.metrics_util.request_metrics import (
+    RequestMetrics,
+    current_metrics,
+    registry
+)
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_METRICS = ('db', 'serializer', 'render', 'total')
+ROUTE_METHODS = frozenset(
+    method.upper() for method in View.http_method_names
+)
+OTHER_METHOD = 'OTHER'
+UNRESOLVED_ROUTE = 'unresolved'
+
+
+def get_query_origin():
+    """Последний вызов из кода проекта в стеке запроса к базе."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        if (frame.filename.startswith(base_dir)
+                and 'site-packages' not in frame.filename
+                and 'metrics_util' not in frame.filename):
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryRecorder:
+    """Счетчик запросов к базе данных и их длительности."""
+
+    def __init__(self, metrics):
+        """Init метод класса."""
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполнение запроса с замером длительности.
+
+        Запросы дольше SLOW_QUERY_THRESHOLD_MS записываются в лог
+        вместе с местом вызова в коде проекта.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.metrics.query_count += 1
+            self.metrics.add_duration('db', duration)
+            if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+                logger.warning(
+                    'Медленный запрос %.1f мс из %s: %s',
+                    duration, get_query_origin(), sql
+                )
+
+
+def get_route_name(request):
+    """Имя маршрута запроса вместе с методом.
+
+    Метод и путь задает клиент, поэтому методы не из
+    View.http_method_names записываются как OTHER, а запросы
+    без маршрута - под одним именем: число маршрутов в метриках
+    ограничено маршрутами проекта.
+    """
+    method = request.method
+    if method not in ROUTE_METHODS:
+        method = OTHER_METHOD
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return f'{method} {UNRESOLVED_ROUTE}'
+    return f'{method} {resolver_match.view_name}'
+
+
+class InstrumentationMiddleware:
+    """Количество и время запросов к базе, общее время ответа.
+
+    Время сериализации и рендеринга добавляют вьюсеты
+    с InstrumentedViewMixin. Метрики добавляются в гистограммы
+    маршрута, в метрики Prometheus и в заголовок Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        """Init метод класса."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Обработка запроса с записью метрик."""
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(QueryRecorder(metrics))
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        values = metrics.get_values()
+        route = get_route_name(request)
+        registry.record(route, values)
+        record_request(route, values)
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={values[name]:.1f}'
+                + (f';desc="{metrics.query_count} queries"'
+                   if name == 'db' else '')
+                for name in SERVER_TIMING_METRICS
+                if name in values
+            )
+        return response
@@ -0,0 +1,27 @@
+"""Миксины вьюсетов для метрик запросов."""
+from utils.metrics_util.request_metrics import measure, timed
+
+
+class InstrumentedViewMixin:
+    """Время сериализации и рендеринга ответа в метриках запроса."""
+
+    def get_serializer(self, *args, **kwargs):
+        """Сериализатор с замером проверки и вывода данных."""
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.run_validation = timed(
+            'serializer', serializer.run_validation
+        )
+        serializer.to_representation = timed(
+            'serializer', serializer.to_representation
+        )
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Рендеринг ответа с замером длительности."""
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if hasattr(response, 'render') and not response.is_rendered:
+            with measure('render'):
+                response.render()
+        return response
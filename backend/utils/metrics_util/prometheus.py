@@ -0,0 +1,83 @@
+"""Метрики в формате Prometheus.
+
+Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR,
+каждый процесс gunicorn пишет значения метрик в файлы этого
+каталога, а при выдаче они суммируются по всем процессам.
+Каталог задается и очищается в gunicorn.conf.py.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+from utils.constants.constants import PROMETHEUS_LATENCY_BUCKETS
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время ответа по маршрутам',
+    ['route'],
+    buckets=PROMETHEUS_LATENCY_BUCKETS
+)
+DB_QUERIES = Counter(
+    'foodgram_db_queries',
+    'Количество запросов к базе данных по маршрутам',
+    ['route']
+)
+DB_QUERY_DURATION = Counter(
+    'foodgram_db_query_duration_seconds',
+    'Время запросов к базе данных по маршрутам',
+    ['route']
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кэшам, попадания и промахи',
+    ['cache', 'result']
+)
+PDF_RENDER_DURATION = Histogram(
+    'foodgram_pdf_render_duration_seconds',
+    'Время создания pdf списка покупок',
+    buckets=PROMETHEUS_LATENCY_BUCKETS
+)
+IMAGE_PROCESSING_DURATION = Histogram(
+    'foodgram_image_processing_duration_seconds',
+    'Время создания вариантов изображения рецепта',
+    buckets=PROMETHEUS_LATENCY_BUCKETS
+)
+
+
+def record_request(route, values):
+    """Метрики запроса из RequestMetrics.
+
+    route - имя из get_route_name: каждое новое значение метки
+    создает серии во всех метриках маршрутов и в файлах
+    PROMETHEUS_MULTIPROC_DIR, поэтому оно не задается клиентом.
+    """
+    REQUEST_DURATION.labels(route).observe(values['total'] / 1000)
+    DB_QUERIES.labels(route).inc(values['queries'])
+    DB_QUERY_DURATION.labels(route).inc(values.get('db', 0) / 1000)
+
+
+def record_cache(cache_name, hit):
+    """Попадание или промах кэша."""
+    CACHE_REQUESTS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def get_registry():
+    """Реестр метрик всех процессов или текущего процесса."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    """Тип содержимого и текст метрик для Prometheus."""
+    return CONTENT_TYPE_LATEST, generate_latest(get_registry())
@@ -0,0 +1,129 @@
+"""Метрики запросов по маршрутам.
+
+Метрики текущего запроса хранятся в contextvar и заполняются
+middleware и вьюсетами. После ответа они добавляются в скользящие
+гистограммы маршрута в памяти процесса.
+"""
+import bisect
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+
+from django.conf import settings
+
+from utils.constants.constants import (
+    METRICS_HISTOGRAM_BUCKETS,
+    METRICS_PERCENTILES
+)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        """Init метод класса."""
+        self.start = time.perf_counter()
+        self.query_count = 0
+        self.durations = defaultdict(float)
+
+    def add_duration(self, name, duration):
+        """Добавление длительности в миллисекундах."""
+        self.durations[name] += duration
+
+    def get_values(self):
+        """Значения метрик запроса для гистограмм."""
+        return {
+            'total': (time.perf_counter() - self.start) * 1000,
+            'queries': self.query_count,
+            **self.durations,
+        }
+
+
+@contextmanager
+def measure(name):
+    """Замер длительности блока в метриках текущего запроса."""
+    metrics = current_metrics.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_duration(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name, function):
+    """Функция с замером длительности в метриках текущего запроса."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with measure(name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+class RollingHistogram:
+    """Гистограмма последних значений метрики."""
+
+    def __init__(self, size):
+        """Init метод класса."""
+        self.samples = deque(maxlen=size)
+
+    def add(self, value):
+        """Добавление значения."""
+        self.samples.append(value)
+
+    def snapshot(self):
+        """Количество, среднее, перцентили и корзины гистограммы."""
+        samples = sorted(self.samples)
+        if not samples:
+            return {'count': 0}
+        data = {
+            'count': len(samples),
+            'mean': round(sum(samples) / len(samples), 3),
+            'max': round(samples[-1], 3),
+        }
+        for percentile in METRICS_PERCENTILES:
+            index = min(len(samples) - 1, len(samples) * percentile // 100)
+            data[f'p{percentile}'] = round(samples[index], 3)
+        data['buckets'] = {
+            str(bound): bisect.bisect_right(samples, bound)
+            for bound in METRICS_HISTOGRAM_BUCKETS
+        }
+        return data
+
+
+class MetricsRegistry:
+    """Гистограммы метрик по маршрутам."""
+
+    def __init__(self, size):
+        """Init метод класса."""
+        self.size = size
+        self.lock = Lock()
+        self.routes = defaultdict(dict)
+
+    def record(self, route, values):
+        """Добавление метрик запроса к маршруту."""
+        with self.lock:
+            histograms = self.routes[route]
+            for name, value in values.items():
+                if name not in histograms:
+                    histograms[name] = RollingHistogram(self.size)
+                histograms[name].add(value)
+
+    def snapshot(self):
+        """Текущие гистограммы всех маршрутов."""
+        with self.lock:
+            return {
+                route: {
+                    name: histogram.snapshot()
+                    for name, histogram in sorted(histograms.items())
+                }
+                for route, histograms in sorted(self.routes.items())
+            }
+
+
+registry = MetricsRegistry(settings.METRICS_WINDOW)
@@ -0,0 +1,34 @@
+"""Выдача метрик запросов и метрик Prometheus."""
+from django.http import HttpResponse
+
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from utils.metrics_util.prometheus import render_metrics
+from utils.metrics_util.request_metrics import registry
+
+
+class RequestMetricsView(APIView):
+    """Гистограммы метрик запросов по маршрутам для персонала."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        """Гистограммы метрик процесса."""
+        return Response(registry.snapshot())
+
+
+class PrometheusMetricsView(APIView):
+    """Метрики в формате Prometheus для персонала.
+
+    Prometheus авторизуется токеном сотрудника в заголовке
+    Authorization: Token.
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        """Текст метрик всех процессов gunicorn."""
+        content_type, content = render_metrics()
+        return HttpResponse(content, content_type=content_type)
@@ -0,0 +1,86 @@
+"""Постраничная выдача для API."""
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination
+)
+
+from utils.constants.constants import (
+    CURSOR_PAGINATION,
+    MAX_PAGE_SIZE,
+    ORDERING_PARAM
+)
+
+
+class LimitPageNumberPagination(PageNumberPagination):
+    """Выдача по номерам страниц с размером страницы limit."""
+
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class IdCursorPagination(CursorPagination):
+    """Выдача по курсору в порядке убывания первичного ключа.
+
+    Страница выбирается условием по индексу первичного ключа,
+    без COUNT и OFFSET, поэтому стоимость страницы не зависит
+    от её глубины.
+    """
+
+    ordering = '-id'
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """Порядок выдачи.
+
+        При параметре ordering курсор следует сортировке, которую
+        фильтр задал выдаче, иначе выдача идет по убыванию id.
+        """
+        if (
+            request.query_params.get(ORDERING_PARAM)
+            and queryset.query.order_by
+        ):
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
+
+
+class OptionalCursorPagination(BasePagination):
+    """Выдача по номерам страниц или по курсору на выбор клиента.
+
+    Курсорная выдача включается параметром pagination=cursor,
+    ссылки next и previous в ней уже содержат параметр cursor.
+    """
+
+    def __init__(self):
+        """Init метод класса."""
+        self.page_number_pagination = LimitPageNumberPagination()
+        self.cursor_pagination = IdCursorPagination()
+        self.paginator = self.page_number_pagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Выбор способа выдачи и страница выдачи."""
+        if (
+            request.query_params.get('pagination') == CURSOR_PAGINATION
+            or self.cursor_pagination.cursor_query_param
+            in request.query_params
+        ):
+            self.paginator = self.cursor_pagination
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Ответ со страницей выдачи."""
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        """Схема ответа для выдачи по номерам страниц."""
+        return self.page_number_pagination.get_paginated_response_schema(
+            schema
+        )
+
+    def get_schema_operation_parameters(self, view):
+        """Параметры обоих способов выдачи для схемы API."""
+        return (
+            self.page_number_pagination.get_schema_operation_parameters(view)
+            + self.cursor_pagination.get_schema_operation_parameters(view)
+        )
@@ -0,0 +1,39 @@
+"""Кэш готовых pdf файлов списка покупок."""
+import hashlib
+import json
+
+from django.core.cache import caches
+
+from utils.constants.constants import (
+    PDF_CACHE_ALIAS,
+    PDF_CACHE_TIMEOUT,
+    PDF_TEMPLATE_VERSION
+)
+from utils.metrics_util.prometheus import PDF_RENDER_DURATION, record_cache
+
+
+def get_pdf_hash(pdf, data):
+    """Хэш содержимого pdf.
+
+    Зависит только от строк списка покупок, заголовков
+    и версии шаблона, поэтому одинаковые списки дают один хэш.
+    """
+    payload = json.dumps(
+        [PDF_TEMPLATE_VERSION, pdf.Title, pdf.pageinfo, data],
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_cached_pdf(pdf, data, pdf_hash):
+    """Содержимое pdf из кэша, при промахе pdf создается и кэшируется."""
+    cache = caches[PDF_CACHE_ALIAS]
+    key = f'shopping-list-pdf:{pdf_hash}'
+    content = cache.get(key)
+    record_cache(PDF_CACHE_ALIAS, content is not None)
+    if content is None:
+        with PDF_RENDER_DURATION.time():
+            content = pdf.render_pdf_with_table(data)
+        cache.set(key, content, PDF_CACHE_TIMEOUT)
+    return content
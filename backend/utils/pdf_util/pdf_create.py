@@ -15,16 +15,19 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.rl_config import defaultPageSize
 
-pdfmetrics.registerFont(TTFont
-                        ('DejaVuSerif', 'utils/pdf_util/DejaVuSerif.ttf')
-                        )
-
-
 PAGE_HEIGHT = defaultPageSize[1]
 PAGE_WIDTH = defaultPageSize[0]
 styles = getSampleStyleSheet()
 
 
+def register_fonts():
+    """Регистрация шрифта при первом создании pdf."""
+    if 'DejaVuSerif' not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont('DejaVuSerif', 'utils/pdf_util/DejaVuSerif.ttf')
+        )
+
+
 class PdfCreator():
     """Класс для создания pdf."""
 
@@ -38,6 +41,18 @@ class PdfCreator():
 
     def create_pdf_with_table(self, data):
         """Создать pdf с таблицей."""
+        return self.create_response(self.render_pdf_with_table(data))
+
+    def create_response(self, content):
+        """Ответ с готовым pdf файлом."""
+        return FileResponse(
+            BytesIO(content), as_attachment=True,
+            filename='shopping-list.pdf'
+        )
+
+    def render_pdf_with_table(self, data):
+        """Содержимое pdf с таблицей в байтах."""
+        register_fonts()
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=(21 * cm, 29.7 * cm))
         Story = [Spacer(1, 2 * inch)]
@@ -72,11 +87,7 @@ class PdfCreator():
                   onLaterPages=self.myLaterPages
                   )
 
-        buffer.seek(0)
-        return FileResponse(
-            buffer, as_attachment=True,
-            filename='shopping-list.pdf'
-        )
+        return buffer.getvalue()
 
     def myFirstPage(self, canvas, doc):
         """Первая страница списка покупок с заголовком."""